@@ -5,23 +5,86 @@ import os
 from pygame.locals import *
 import json
 import math
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 import openai
-from openai import OpenAI
 from dotenv import load_dotenv
+from tarot_core import (
+    major_arcana, card_meanings, REVERSED_CHANCE, CARD_MEANINGS_PATH, CARD_IMAGES_DIR,
+    SPREAD_SINGLE, SPREAD_THREE, SPREAD_CELTIC, SPREAD_NAMES,
+    get_spread_name, DeckEngine, build_reading_data, parse_ai_response, merge_revision, reload_card_meanings
+)
+from tarot_ai import AIScheduler, INTERPRETER_CHOICES, get_interpreter, request_interpretation
+from tarot_search import HISTORY_PATH, ReadingIndex, build_meaning_neighbours
 
 # Load API key from .env file
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# All AI requests share one rate limit (TAROT_AI_RPM, TAROT_AI_CONCURRENCY)
+ai_scheduler = AIScheduler.from_env()
+
 # Initialize PyGame
 pygame.init()
 pygame.mixer.init()
 
-# Set to full screen
-screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-WIDTH, HEIGHT = screen.get_size()
+# Render quality presets: (internal resolution as a fraction of the display, glow and shadow effects)
+RENDER_PRESETS = {
+    "native": (1.0, True),
+    "high": (0.75, True),
+    "balanced": (0.5, True),
+    "low": (0.5, False),
+}
+MIN_RENDER_HEIGHT = 720  # The layout needs at least this many lines, whatever the preset
+MIN_TABLE_WIDTH = 1320  # Room for the row of buttons, when tables sit side by side
+
+quality = os.getenv("TAROT_QUALITY", "native").lower()
+if quality not in RENDER_PRESETS:
+    print(f"Unknown TAROT_QUALITY {quality!r}, using native. Choose one of: {', '.join(RENDER_PRESETS)}")
+    quality = "native"
+render_scale, effects = RENDER_PRESETS[quality]
+if os.getenv("TAROT_EFFECTS"):
+    effects = os.getenv("TAROT_EFFECTS") != "0"
+
+# Set to full screen, unless TAROT_WINDOW_SIZE (e.g. 1920x1080) asks for a fixed-size window
+window_size = os.getenv("TAROT_WINDOW_SIZE")
+if window_size:
+    display = pygame.display.set_mode(tuple(int(v) for v in window_size.lower().split("x")))
+else:
+    display = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+DISPLAY_WIDTH, DISPLAY_HEIGHT = display.get_size()
 pygame.display.set_caption("Mystic Tarot Reader")
 
+# TAROT_TABLES (e.g. 2x2, or 3 for three side by side) runs that many independent tables in one window
+table_grid = os.getenv("TAROT_TABLES", "1").lower().split("x")
+TABLE_COLUMNS, TABLE_ROWS = int(table_grid[0]), int(table_grid[1]) if len(table_grid) > 1 else 1
+
+# Everything is drawn onto screen, at WIDTH x HEIGHT. Below native quality that is an
+# offscreen canvas, scaled to the display once per frame by present(). A grid of tables
+# too big for the display is drawn larger and scaled down.
+needed_scale = TABLE_ROWS * MIN_RENDER_HEIGHT / DISPLAY_HEIGHT
+if TABLE_COLUMNS > 1:
+    needed_scale = max(needed_scale, TABLE_COLUMNS * MIN_TABLE_WIDTH / DISPLAY_WIDTH)
+render_scale = min(max(1.0, needed_scale), max(render_scale, needed_scale))
+WIDTH, HEIGHT = round(DISPLAY_WIDTH * render_scale), round(DISPLAY_HEIGHT * render_scale)
+if (WIDTH, HEIGHT) == (DISPLAY_WIDTH, DISPLAY_HEIGHT):
+    screen = display
+else:
+    screen = pygame.Surface((WIDTH, HEIGHT)).convert()
+
+
+
+def to_render_pos(pos):
+    """Map a position on the display to the same point on the render target"""
+    return pos[0] * WIDTH // DISPLAY_WIDTH, pos[1] * HEIGHT // DISPLAY_HEIGHT
+
+
+def present():
+    """Show the finished frame, scaling it to the display first when it is drawn at another size"""
+    if screen is not display:
+        pygame.transform.scale(screen, (DISPLAY_WIDTH, DISPLAY_HEIGHT), display)
+    pygame.display.flip()
+
 # Colors - updated with more mystical palette
 WHITE = (255, 255, 255)
 BLACK = (10, 10, 20)
@@ -39,24 +102,214 @@ try:
     font = pygame.font.Font("fonts/mystical.ttf", 36)
     small_font = pygame.font.Font("fonts/mystical.ttf", 30)
     meaning_font = pygame.font.Font("fonts/mystical.ttf", 32)
+    # Card faces are built on a worker thread, and font objects can't be shared between threads
+    card_font = pygame.font.Font("fonts/mystical.ttf", 36)
+    card_small_font = pygame.font.Font("fonts/mystical.ttf", 30)
 except:
     title_font = pygame.font.Font(None, 60)
     font = pygame.font.Font(None, 36)
     small_font = pygame.font.Font(None, 30)
     meaning_font = pygame.font.Font(None, 32)
+    card_font = pygame.font.Font(None, 36)
+    card_small_font = pygame.font.Font(None, 30)
+stats_font = pygame.font.Font(None, 24)  # Plain and compact, for the F3 surface memory overlay
 
 # Card dimensions - made significantly larger
 CARD_WIDTH, CARD_HEIGHT = 300, 500
 
+SIMILAR_READINGS = 5  # Matches listed by Similar Readings (S)
+
+# Deal-in animation: each card flies from the deck by the crystal ball to its slot
+DEAL_FROM = (130, 130)
+DEAL_FRAMES = 12  # Length of one card's flight
+DEAL_STAGGER = 4  # Frames between one card leaving the deck and the next
+
+
+
+def surface_bytes(surf):
+    return surf.get_pitch() * surf.get_height()
+
+
+
+class SurfaceStats:
+    """Surface memory by category: bytes held in caches and long-lived surfaces,
+    and bytes allocated by throwaway surfaces during each frame.
+    
+    Registered caches are trimmed least-recently-used first whenever their
+    total goes over the budget (TAROT_CACHE_BUDGET_MB, unlimited if unset).
+    Entries used in this frame or the one before are on screen and never
+    evicted, so the caches may stay over a budget smaller than one frame needs.
+    """
+    
+    def __init__(self, budget_bytes=None, window=300):
+        self.budget = budget_bytes
+        self.caches = []
+        self.held = {}  # key -> (category, bytes) for long-lived surfaces outside any cache
+        self.frame = {}  # category -> bytes allocated so far this frame
+        self.frame_history = deque(maxlen=window)  # Per-frame totals, for steady-state figures
+        self.peak_live = 0
+        self.peak_frame = 0
+        self.peak_frame_categories = {}
+        self.tick = 0
+        self.frame_starts = deque([0, 0], maxlen=2)  # Ticks at the start of the last frame and this one
+    
+    def new_surface(self, size, flags=0, category="other"):
+        """Allocate a throwaway surface and count it against the current frame"""
+        return self.count(pygame.Surface(size, flags), category)
+    
+    def render(self, font, text, color, category="text"):
+        """font.render, counted against the current frame"""
+        return self.count(font.render(text, True, color), category)
+    
+    def count(self, surf, category):
+        self.frame[category] = self.frame.get(category, 0) + surface_bytes(surf)
+        return surf
+    
+    def hold(self, key, category, surf):
+        """Record a long-lived surface (background, panel parchment) that replaces any previous one under key"""
+        self.held[key] = (category, surface_bytes(surf))
+    
+    def release(self, key):
+        self.held.pop(key, None)
+    
+    def next_tick(self):
+        self.tick += 1
+        return self.tick
+    
+    def cached_bytes(self):
+        return sum(cache.bytes for cache in self.caches)
+    
+    def live_by_category(self):
+        live = {}
+        for cache in self.caches:
+            live[cache.category] = live.get(cache.category, 0) + cache.bytes
+        for category, size in self.held.values():
+            live[category] = live.get(category, 0) + size
+        return live
+    
+    def enforce_budget(self):
+        """Evict the least recently used cache entries until the caches fit the budget"""
+        if self.budget is None:
+            return
+        in_use = self.frame_starts[0]  # Entries used since then are on screen
+        while self.cached_bytes() > self.budget:
+            candidates = [cache for cache in self.caches if cache.entries and cache.oldest_tick() <= in_use]
+            if not candidates:
+                return
+            min(candidates, key=lambda cache: cache.oldest_tick()).evict_oldest()
+    
+    def end_frame(self):
+        """Close the books on one frame; call once per displayed frame"""
+        total = sum(self.frame.values())
+        self.frame_history.append(total)
+        if total > self.peak_frame:
+            self.peak_frame = total
+            self.peak_frame_categories = dict(self.frame)
+        self.peak_live = max(self.peak_live, sum(self.live_by_category().values()))
+        self.last_frame = self.frame
+        self.frame = {}
+        self.frame_starts.append(self.tick)
+    
+    def report(self):
+        """Human-readable summary of live, peak and steady-state surface memory"""
+        mb = lambda n: f"{n / (1024 * 1024):.1f} MB"
+        live = self.live_by_category()
+        history = sorted(self.frame_history)
+        steady = history[len(history) // 2] if history else 0
+        lines = [f"Live surfaces: {mb(sum(live.values()))} (peak {mb(self.peak_live)})"]
+        lines += [f"  {category}: {mb(size)}" for category, size in sorted(live.items(), key=lambda item: -item[1])]
+        if self.budget is not None:
+            lines.append(f"Cache budget: {mb(self.cached_bytes())} of {mb(self.budget)}")
+        lines.append(f"Per-frame allocations: {mb(steady)} typical, {mb(self.peak_frame)} peak")
+        lines += [f"  {category}: {mb(size)}" for category, size in
+                  sorted(getattr(self, "last_frame", {}).items(), key=lambda item: -item[1])]
+        if self.peak_frame_categories:
+            lines.append("Peak frame by category:")
+            lines += [f"  {category}: {mb(size)}" for category, size in
+                      sorted(self.peak_frame_categories.items(), key=lambda item: -item[1])]
+        return "\n".join(lines)
+
+
+
+class SurfaceCache:
+    """Keyed cache of surfaces (or objects with an nbytes attribute) counted by SurfaceStats"""
+    
+    def __init__(self, category, stats):
+        self.category = category
+        self.stats = stats
+        self.entries = OrderedDict()  # key -> [value, bytes, last-used tick], oldest first
+        self.bytes = 0
+        stats.caches.append(self)
+    
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        entry[2] = self.stats.next_tick()
+        self.entries.move_to_end(key)
+        return entry[0]
+    
+    def put(self, key, value):
+        self.pop(key)
+        size = getattr(value, "nbytes", None)
+        if size is None:
+            size = surface_bytes(value)
+        self.entries[key] = [value, size, self.stats.next_tick()]
+        self.bytes += size
+        self.stats.enforce_budget()
+        return value
+    
+    def pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+    
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+    
+    def oldest_tick(self):
+        return next(iter(self.entries.values()))[2]
+    
+    def evict_oldest(self):
+        key, entry = self.entries.popitem(last=False)
+        self.bytes -= entry[1]
+    
+    def __contains__(self, key):
+        return key in self.entries
+    
+    def __len__(self):
+        return len(self.entries)
+
+
+
+budget_mb = os.getenv("TAROT_CACHE_BUDGET_MB")
+surface_stats = SurfaceStats(budget_bytes=int(float(budget_mb) * 1024 * 1024) if budget_mb else None)
+
+# Labels, button text and headings are the same every frame and on every table, so each is rendered once
+TEXT_CACHE_ENTRIES = 512
+text_cache = SurfaceCache("text", surface_stats)
+
+
+def render_text(font, text, color):
+    """font.render, cached by font, text and colour"""
+    key = (font, text, color)
+    surf = text_cache.get(key)
+    if surf is None:
+        surf = text_cache.put(key, font.render(text, True, color))
+        if len(text_cache) > TEXT_CACHE_ENTRIES:
+            text_cache.evict_oldest()
+    return surf
+
 # Load background image or create gradient
-def create_background():
-    bg = pygame.Surface((WIDTH, HEIGHT))
+def create_background(width=WIDTH, height=HEIGHT):
+    bg = pygame.Surface((width, height))
     bg.fill(DARK_PURPLE)
     
     # Draw stars
     for _ in range(200):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
+        x = random.randint(0, width)
+        y = random.randint(0, height)
         size = random.randint(1, 3)
         brightness = random.randint(150, 255)
         color = (brightness, brightness, brightness)
@@ -64,8 +317,8 @@ def create_background():
     
     # Draw subtle cosmic glow
     for i in range(3):
-        center_x = random.randint(0, WIDTH)
-        center_y = random.randint(0, HEIGHT)
+        center_x = random.randint(0, width)
+        center_y = random.randint(0, height)
         radius = random.randint(100, 300)
         alpha = random.randint(10, 30)
         s = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
@@ -74,31 +327,472 @@ def create_background():
     
     return bg
 
-background = create_background()
+backgrounds = {}  # (width, height) -> background, shared by every table of that size
+
+
+def get_background(width, height):
+    bg = backgrounds.get((width, height))
+    if bg is None:
+        bg = backgrounds[(width, height)] = create_background(width, height)
+        surface_stats.hold(("background", width, height), "background", bg)
+    return bg
+
+
+
+
+
+
+
+def spread_layout(spread_type, width, height):
+    """Return the (x, y) centre of each card position for a spread on a width x height screen"""
+    if spread_type == SPREAD_SINGLE:
+        return [(width//2, height//2 - 100)]
+    elif spread_type == SPREAD_THREE:
+        return [
+            (width//4, height//2 - 100), 
+            (width//2, height//2 - 100), 
+            (3*width//4, height//2 - 100)
+        ]
+    else:
+        return [
+            (width//2, height//3),                    # 1 - Present (center top)
+            (width//2, 2*height//3),                 # 2 - Challenge (center bottom)
+            (width//4, height//3 - CARD_HEIGHT//2),  # 3 - Past (left of 1, moved up)
+            (3*width//4, height//3 - CARD_HEIGHT//2),# 4 - Future (right of 1, moved up)
+            (width//4, height//2),                   # 5 - Above (left middle)
+            (3*width//4, height//2),                 # 6 - Below (right middle)
+            (width//4, 2*height//3 + CARD_HEIGHT//2),# 7 - Advice (left bottom, moved down)
+            (3*width//4, 2*height//3 + CARD_HEIGHT//2), # 8 - External (right bottom, moved down)
+            (width//6, height//2),                   # 9 - Hopes/Fears (far left)
+            (5*width//6, height//2)                  # 10 - Outcome (far right)
+        ]
+
+
+
+spread_layouts = {}  # (width, height) -> {spread type: positions}, shared by every table of that size
+
+
+def get_spread_layouts(width, height):
+    layouts = spread_layouts.get((width, height))
+    if layouts is None:
+        layouts = spread_layouts[(width, height)] = {
+            spread_type: spread_layout(spread_type, width, height) for spread_type in SPREAD_NAMES
+        }
+    return layouts
+
+
+
+# Card faces never change between draws, so each one is built once and shared
+card_face_cache = SurfaceCache("card faces", surface_stats)
+
+
+def get_card_face(name):
+    """Return the face for a card, building it on first use.
+    
+    Blocks while the face is built, so it is for headless export; the game
+    goes through card_face_loader instead.
+    """
+    face = card_face_cache.get(name)
+    if face is None:
+        face = create_card_face(name)
+        card_face_cache.put(name, face)
+    return face
+
+
+
+class CardFaceLoader:
+    """Builds card faces on a worker thread so dealing a spread never stalls a frame.
+    
+    Finished faces are moved into card_face_cache on the main thread, by ready().
+    """
+    
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="card-faces")
+        self.pending = {}  # name -> Future for the face being built
+        self.refreshing = {}  # name -> Future for a new face replacing a cached one
+    
+    def request(self, name):
+        """Start building a face unless it is cached or already on its way"""
+        if name not in card_face_cache and name not in self.pending:
+            self.pending[name] = self.executor.submit(create_card_face, name)
+    
+    def ready(self, name):
+        """Return the face if it has been built, or None while it is still being prepared"""
+        face = card_face_cache.get(name)
+        if face is not None:
+            return face
+        future = self.pending.get(name)
+        if future is None:
+            self.request(name)
+            return None
+        if not future.done():
+            return None
+        del self.pending[name]
+        return card_face_cache.put(name, future.result())
+    
+    def wait(self, name):
+        """Return the face, blocking until the worker has built it"""
+        self.request(name)
+        future = self.pending.get(name)
+        if future is not None:
+            future.result()
+        return self.ready(name)
+    
+    def refresh(self, name):
+        """Rebuild a face whose image or meaning changed, keeping the old one on screen until then"""
+        if name in card_face_cache:
+            self.refreshing[name] = self.executor.submit(create_card_face, name)
+        elif self.pending.pop(name, None) is not None:
+            self.request(name)  # The face on its way may have been built from the old file
+    
+    def collect(self):
+        """Swap in the refreshed faces that have finished"""
+        for name, future in list(self.refreshing.items()):
+            if future.done():
+                del self.refreshing[name]
+                card_face_cache.put(name, future.result())
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+card_face_loader = CardFaceLoader()
+
+
+
+class AssetWatcher:
+    """Polls card_meanings.json and card_images/ and reloads only the cards that changed.
+    
+    Faces are rebuilt for those cards alone, so untouched images are never decoded again.
+    """
+    
+    def __init__(self, interval_ms=1000):
+        self.interval_ms = interval_ms
+        self.next_poll = 0
+        self.meanings_stamp = file_stamp(CARD_MEANINGS_PATH)
+        self.image_stamps = self.scan_images()
+    
+    def scan_images(self):
+        stamps = {}
+        try:
+            with os.scandir(CARD_IMAGES_DIR) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        stamps[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            pass
+        return stamps
+    
+    def poll(self, games):
+        """Swap in rebuilt faces, and look for changed files once per interval; returns the changed cards"""
+        card_face_loader.collect()
+        now = pygame.time.get_ticks()
+        if now < self.next_poll:
+            return {}
+        self.next_poll = now + self.interval_ms
+        
+        changed = {}  # card name -> set of changed card_meanings.json fields
+        stamp = file_stamp(CARD_MEANINGS_PATH)
+        if stamp != self.meanings_stamp:
+            self.meanings_stamp = stamp
+            try:
+                changed = reload_card_meanings()
+            except (OSError, ValueError) as e:
+                # Probably saved halfway; the next save changes the stamp and we try again
+                print(f"Could not reload card_meanings.json: {e}")
+        
+        stamps = self.scan_images()
+        if stamps != self.image_stamps:
+            files = {name for name in stamps.keys() | self.image_stamps.keys()
+                     if stamps.get(name) != self.image_stamps.get(name)}
+            self.image_stamps = stamps
+            for name, meanings in card_meanings.items():
+                if meanings.get('image') in files:
+                    changed.setdefault(name, set()).add('image')
+        
+        if changed:
+            for name, fields in changed.items():
+                if 'image' in fields:
+                    card_face_loader.refresh(name)
+            for game in games:
+                game.reload_cards(changed)
+            if reading_index is not None and any(fields - {'image'} for fields in changed.values()):
+                reading_index.neighbours = build_meaning_neighbours(card_meanings)
+        return changed
+
+
+reading_index = None  # ReadingIndex over readings/history.jsonl, shared by every table
+
+
+def get_reading_index():
+    """Open the index of saved readings on first use, catching up on any saved since it was last written"""
+    global reading_index
+    if reading_index is None:
+        reading_index = ReadingIndex.open(os.path.abspath(HISTORY_PATH))
+    return reading_index
+
+
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Stands in for a card whose face is still on its way
+card_placeholder = pygame.Surface((CARD_WIDTH, CARD_HEIGHT), pygame.SRCALPHA)
+pygame.draw.rect(card_placeholder, (*PURPLE, 90), (0, 0, CARD_WIDTH, CARD_HEIGHT), border_radius=15)
+pygame.draw.rect(card_placeholder, (*GOLD, 120), (0, 0, CARD_WIDTH, CARD_HEIGHT), 2, border_radius=15)
+surface_stats.hold("card placeholder", "card faces", card_placeholder)
+
+crystal_ball = False  # Loaded on first use and shared by every table; None if it is missing
+
+
+def load_crystal_ball():
+    global crystal_ball
+    if crystal_ball is False:
+        # Try to load crystal ball image
+        try:
+            crystal_ball = pygame.transform.scale(pygame.image.load("crystal_ball.png"), (200, 200))
+            surface_stats.hold("crystal ball", "images", crystal_ball)
+        except:
+            crystal_ball = None
+    return crystal_ball
+
+
+
+def create_card_face(name):
+    """Create a card image with background color and card image"""
+    surf = pygame.Surface((CARD_WIDTH, CARD_HEIGHT), pygame.SRCALPHA)
+    
+    # Set background color based on card type
+    if name in major_arcana:
+        # Seeded by name so a cached face always gets the same tint
+        rng = random.Random(name)
+        top_color = (rng.randint(50, 100), rng.randint(20, 60), rng.randint(80, 120))
+        bottom_color = (top_color[0]//2, top_color[1]//2, top_color[2]//2)
+    else:
+        if "Wands" in name:
+            top_color = (200, 150, 50)  # Orange
+            bottom_color = (150, 70, 20)  # Darker orange
+        elif "Cups" in name:
+            top_color = (50, 120, 200)  # Blue
+            bottom_color = (20, 70, 150)  # Deeper blue
+        elif "Swords" in name:
+            top_color = (180, 180, 200)  # Silver
+            bottom_color = (120, 120, 150)  # Darker silver
+        else:  # Pentacles
+            top_color = (150, 120, 50)  # Earthy gold
+            bottom_color = (100, 80, 20)  # Darker earth
+    
+    # Draw gradient background
+    for y in range(CARD_HEIGHT):
+        ratio = y / CARD_HEIGHT
+        r = int(top_color[0] + (bottom_color[0] - top_color[0]) * ratio)
+        g = int(top_color[1] + (bottom_color[1] - top_color[1]) * ratio)
+        b = int(top_color[2] + (bottom_color[2] - top_color[2]) * ratio)
+        pygame.draw.line(surf, (r, g, b), (0, y), (CARD_WIDTH, y))
+    
+    # Try to load card image if filename exists
+    image_filename = card_meanings.get(name, {}).get('image', None)
+    if image_filename:
+        try:
+            # Get the full path to the image
+            image_path = os.path.join(CARD_IMAGES_DIR, image_filename)
+            
+            # Load and convert the image
+            card_img = pygame.image.load(image_path).convert_alpha()
+            card_img = pygame.transform.scale(card_img, (CARD_WIDTH - 40, CARD_HEIGHT - 100))
+            
+            # Apply the image to the card surface
+            surf.blit(card_img, (20, 30))
+        except Exception as e:
+            print(f"Error loading image {image_filename}: {e}")
+            draw_card_text(surf, name)
+    else:
+        draw_card_text(surf, name)
+    
+    # Draw card name at bottom
+    name_surface = pygame.Surface((CARD_WIDTH - 20, 50), pygame.SRCALPHA)
+    pygame.draw.rect(name_surface, (*GOLD, 100), (0, 0, name_surface.get_width(), name_surface.get_height()), border_radius=10)
+    name_text = card_small_font.render(name, True, WHITE)
+    name_surface.blit(name_text, (name_surface.get_width()//2 - name_text.get_width()//2, 
+                                name_surface.get_height()//2 - name_text.get_height()//2))
+    surf.blit(name_surface, (10, CARD_HEIGHT - 60))
+    
+    return surf
+
+
+
+def draw_card_text(surf, name):
+    """Fallback method to draw card name as text when image isn't available"""
+    words = name.split()
+    lines = []
+    current_line = words[0]
+    for word in words[1:]:
+        if len(current_line) + len(word) < 15:
+            current_line += " " + word
+        else:
+            lines.append(current_line)
+            current_line = word
+    lines.append(current_line)
+    
+    # Render text with larger font and better spacing
+    for i, line in enumerate(lines[:4]):  # Now can fit 4 lines
+        text = card_font.render(line, True, WHITE)
+        shadow = card_font.render(line, True, (0, 0, 0, 150))
+        
+        # Draw shadow first
+        surf.blit(shadow, (CARD_WIDTH//2 - text.get_width()//2 + 2, 60 + i*50 + 2))
+        # Then draw main text
+        surf.blit(text, (CARD_WIDTH//2 - text.get_width()//2, 60 + i*50))
+
+
+
+
+
+
+def draw_title(screen, width, time):
+    """Draw the glowing "Mystic Tarot Reader" heading centred across the top of the screen"""
+    title_text = render_text(title_font, "Mystic Tarot Reader", WHITE)
+    if not effects:
+        screen.blit(title_text, (width//2 - title_text.get_width()//2, 40))
+        return
+    shadow_text = render_text(title_font, "Mystic Tarot Reader", (0, 0, 0, 150))
+    
+    # Create a glowing effect behind the title
+    title_glow = surface_stats.new_surface((title_text.get_width() + 40, title_text.get_height() + 40), pygame.SRCALPHA, "title")
+    glow_radius = 20 + 5 * math.sin(time * 2)
+    for r in range(int(glow_radius), 0, -1):
+        alpha = int(50 * (r / glow_radius))
+        pygame.draw.rect(title_glow, (*LIGHT_PURPLE, alpha), 
+                        (20 - r, 20 - r, title_text.get_width() + 2*r, title_text.get_height() + 2*r), 
+                        border_radius=10)
+    
+    screen.blit(title_glow, (width//2 - title_glow.get_width()//2, 20))
+    screen.blit(shadow_text, (width//2 - title_text.get_width()//2 + 3, 40 + 3))
+    screen.blit(title_text, (width//2 - title_text.get_width()//2, 40))
+
+
+
+def draw_card_slot(screen, image, pos, position_name, reversed, lift=0):
+    """Draw a card face centred on pos with its shadow, position label and reversed tag"""
+    x, y = pos
+    
+    # Draw card with subtle shadow
+    if effects:
+        shadow_offset = 10
+        shadow_surf = surface_stats.new_surface((CARD_WIDTH, CARD_HEIGHT), pygame.SRCALPHA, "shadow")
+        shadow_surf.fill((0, 0, 0, 100))
+        screen.blit(shadow_surf, (x - CARD_WIDTH//2 + shadow_offset, y - CARD_HEIGHT//2 + shadow_offset))
+    
+    # Draw the actual card, lifted when hovered
+    screen.blit(image, (x - CARD_WIDTH//2, y - CARD_HEIGHT//2 + lift))
+    
+    # Draw position name with fancy styling
+    name_bg = surface_stats.new_surface((200, 40), pygame.SRCALPHA, "labels")
+    pygame.draw.rect(name_bg, (*DARK_PURPLE, 200), (0, 0, 200, 40), border_radius=10)
+    pygame.draw.rect(name_bg, GOLD, (0, 0, 200, 40), 2, border_radius=10)
+    
+    name_text = render_text(small_font, position_name, WHITE)
+    name_bg.blit(name_text, (100 - name_text.get_width()//2, 20 - name_text.get_height()//2))
+    
+    screen.blit(name_bg, (x - 100, y + CARD_HEIGHT//2 + 20))
+    
+    if reversed:
+        rev_text = render_text(small_font, "(Reversed)", (255, 100, 100))
+        rev_bg = surface_stats.new_surface((rev_text.get_width() + 20, rev_text.get_height() + 10), pygame.SRCALPHA, "labels")
+        pygame.draw.rect(rev_bg, (*DARK_PURPLE, 200), (0, 0, rev_bg.get_width(), rev_bg.get_height()), border_radius=5)
+        rev_bg.blit(rev_text, (10, 5))
+        screen.blit(rev_bg, (x - rev_bg.get_width()//2, y + CARD_HEIGHT//2 + 70))
 
-# Tarot Deck (Complete 78 cards)
-major_arcana = [
-    "0 The Fool", "I The Magician", "II The High Priestess", "III The Empress", 
-    "IV The Emperor", "V The Hierophant", "VI The Lovers", "VII The Chariot", 
-    "VIII Strength", "IX The Hermit", "X Wheel of Fortune", "XI Justice", 
-    "XII The Hanged Man", "XIII Death", "XIV Temperance", "XV The Devil", 
-    "XVI The Tower", "XVII The Star", "XVIII The Moon", "XIX The Sun", 
-    "XX Judgement", "XXI The World"
-]
 
-suits = ["Wands", "Cups", "Swords", "Pentacles"]
-ranks = ["Ace", "2", "3", "4", "5", "6", "7", "8", "9", "10", "Page", "Knight", "Queen", "King"]
-minor_arcana = [f"{rank} of {suit}" for suit in suits for rank in ranks]
 
-full_deck = major_arcana + minor_arcana
 
-with open('card_meanings.json', 'r') as f:
-    card_meanings = json.load(f)
 
-# Spread types
-SPREAD_SINGLE = 1
-SPREAD_THREE = 2
-SPREAD_CELTIC = 3
+
+def wrap_text(text, font, width):
+    """Word-wrap text into lines that fit within width pixels"""
+    lines = []
+    current_line = ""
+    for word in text.split():
+        test_line = current_line + word + " "
+        if font.size(test_line)[0] < width or not current_line:
+            current_line = test_line
+        else:
+            lines.append(current_line)
+            current_line = word + " "
+    if current_line:
+        lines.append(current_line)
+    return lines
+
+
+
+class ScrollPanel:
+    """Wrapped text rendered once into tall tiles; drawing blits only the slice in view"""
+    
+    TILE_HEIGHT = 1024
+    SCROLLBAR_WIDTH = 10
+    
+    def __init__(self, blocks, font, color, width, line_height):
+        """blocks is a list of (text, extra_space_after) pairs, each wrapped to the panel width"""
+        self.width = width
+        self.line_height = line_height
+        self.offset = 0
+        
+        # Lay out every line once
+        lines = []
+        y = 0
+        for text, space_after in blocks:
+            for line in wrap_text(text, font, width - self.SCROLLBAR_WIDTH):
+                lines.append((line, y))
+                y += line_height
+            y += space_after
+        self.content_height = max(y, 1)
+        
+        # Render into fixed-height tiles so very long text never needs one huge surface
+        self.tiles = []
+        for top in range(0, self.content_height, self.TILE_HEIGHT):
+            tile_height = min(self.TILE_HEIGHT, self.content_height - top)
+            self.tiles.append(pygame.Surface((width, tile_height), pygame.SRCALPHA))
+        
+        self.nbytes = sum(surface_bytes(tile) for tile in self.tiles)
+        
+        for line, y in lines:
+            text = font.render(line, True, color)
+            first = y // self.TILE_HEIGHT
+            last = min(len(self.tiles) - 1, (y + text.get_height()) // self.TILE_HEIGHT)
+            for i in range(first, last + 1):  # A line crossing a tile edge goes into both
+                self.tiles[i].blit(text, (0, y - i * self.TILE_HEIGHT))
+    
+    def scroll(self, dy):
+        # Clamped against the view height on the next draw
+        self.offset += dy
+    
+    def draw(self, screen, rect):
+        """Blit the visible part of the panel into rect, with a scroll bar if the text overflows"""
+        max_offset = max(0, self.content_height - rect.height)
+        self.offset = max(0, min(self.offset, max_offset))
+        top = self.offset
+        bottom = top + rect.height
+        
+        for i in range(top // self.TILE_HEIGHT, len(self.tiles)):
+            tile = self.tiles[i]
+            tile_top = i * self.TILE_HEIGHT
+            if tile_top >= bottom:
+                break
+            area_top = max(0, top - tile_top)
+            area_bottom = min(tile.get_height(), bottom - tile_top)
+            screen.blit(tile, (rect.x, rect.y + tile_top + area_top - top),
+                        (0, area_top, self.width, area_bottom - area_top))
+        
+        if max_offset:
+            bar_height = max(30, rect.height * rect.height // self.content_height)
+            bar_y = rect.y + (rect.height - bar_height) * self.offset // max_offset
+            pygame.draw.rect(screen, DARK_GOLD, (rect.right - self.SCROLLBAR_WIDTH + 4, bar_y, 6, bar_height),
+                             border_radius=3)
+
 
 
 
@@ -109,107 +803,38 @@ class TarotCard:
     
     
     
-    def __init__(self, name):
+    def __init__(self, name, rng=random, reversed=None):
         self.name = name
+        self.load_meanings()
+        if reversed is None:
+            reversed = rng.random() < REVERSED_CHANCE  # 20% chance to be reversed
+        self.reversed = reversed
+        self.glow_phase = rng.uniform(0, 2 * math.pi)  # For pulsing glow effect
+        self.deal_frame = None  # Frame its deal-in animation starts, once the face is ready
+        self.deck_seed = None  # Seed of the deck it was drawn from
+        
+        
+        
+    def load_meanings(self):
         # Load meanings from the JSON structure
-        meanings = card_meanings.get(name, {})
+        meanings = card_meanings.get(self.name, {})
         self.upright = meanings.get('upright', "No meaning available.")
         self.reversed_meaning = meanings.get('reversed', "No reversed meaning available.")
         self.image_filename = meanings.get('image', None)  # Store the image filename
-        self.image = self.create_card_image()
-        self.reversed = random.random() < 0.2  # 20% chance to be reversed
-        self.glow_phase = random.uniform(0, 2 * math.pi)  # For pulsing glow effect
         
         
         
-    def update(self):
-        # Update glow effect
-        self.glow_phase = (self.glow_phase + 0.05) % (2 * math.pi)
+    @property
+    def image(self):
+        # Looked up each frame so the face cache sees it in use and budget eviction can free it.
+        # A face evicted while off screen is rebuilt by the loader, with the placeholder shown meanwhile
+        return card_face_loader.ready(self.name) or card_placeholder
         
         
         
-    def create_card_image(self):
-        """Create a card image with background color and card image"""
-        surf = pygame.Surface((CARD_WIDTH, CARD_HEIGHT), pygame.SRCALPHA)
-        
-        # Set background color based on card type
-        if self.name in major_arcana:
-            top_color = (random.randint(50, 100), random.randint(20, 60), random.randint(80, 120))
-            bottom_color = (top_color[0]//2, top_color[1]//2, top_color[2]//2)
-        else:
-            if "Wands" in self.name:
-                top_color = (200, 150, 50)  # Orange
-                bottom_color = (150, 70, 20)  # Darker orange
-            elif "Cups" in self.name:
-                top_color = (50, 120, 200)  # Blue
-                bottom_color = (20, 70, 150)  # Deeper blue
-            elif "Swords" in self.name:
-                top_color = (180, 180, 200)  # Silver
-                bottom_color = (120, 120, 150)  # Darker silver
-            else:  # Pentacles
-                top_color = (150, 120, 50)  # Earthy gold
-                bottom_color = (100, 80, 20)  # Darker earth
-        
-        # Draw gradient background
-        for y in range(CARD_HEIGHT):
-            ratio = y / CARD_HEIGHT
-            r = int(top_color[0] + (bottom_color[0] - top_color[0]) * ratio)
-            g = int(top_color[1] + (bottom_color[1] - top_color[1]) * ratio)
-            b = int(top_color[2] + (bottom_color[2] - top_color[2]) * ratio)
-            pygame.draw.line(surf, (r, g, b), (0, y), (CARD_WIDTH, y))
-        
-        # Try to load card image if filename exists
-        if self.image_filename:
-            try:
-                # Get the full path to the image
-                image_path = os.path.join(os.path.dirname(__file__), "card_images", self.image_filename)
-                
-                # Load and convert the image
-                card_img = pygame.image.load(image_path).convert_alpha()
-                card_img = pygame.transform.scale(card_img, (CARD_WIDTH - 40, CARD_HEIGHT - 100))
-                
-                # Apply the image to the card surface
-                surf.blit(card_img, (20, 30))
-            except Exception as e:
-                print(f"Error loading image {self.image_filename}: {e}")
-                self.draw_card_text(surf)
-        else:
-            self.draw_card_text(surf)
-        
-        # Draw card name at bottom
-        name_surface = pygame.Surface((CARD_WIDTH - 20, 50), pygame.SRCALPHA)
-        pygame.draw.rect(name_surface, (*GOLD, 100), (0, 0, name_surface.get_width(), name_surface.get_height()), border_radius=10)
-        name_text = small_font.render(self.name, True, WHITE)
-        name_surface.blit(name_text, (name_surface.get_width()//2 - name_text.get_width()//2, 
-                                    name_surface.get_height()//2 - name_text.get_height()//2))
-        surf.blit(name_surface, (10, CARD_HEIGHT - 60))
-        
-        return surf
-    
-    
-    
-    def draw_card_text(self, surf):
-        """Fallback method to draw card name as text when image isn't available"""
-        words = self.name.split()
-        lines = []
-        current_line = words[0]
-        for word in words[1:]:
-            if len(current_line) + len(word) < 15:
-                current_line += " " + word
-            else:
-                lines.append(current_line)
-                current_line = word
-        lines.append(current_line)
-        
-        # Render text with larger font and better spacing
-        for i, line in enumerate(lines[:4]):  # Now can fit 4 lines
-            text = font.render(line, True, WHITE)
-            shadow = font.render(line, True, (0, 0, 0, 150))
-            
-            # Draw shadow first
-            surf.blit(shadow, (CARD_WIDTH//2 - text.get_width()//2 + 2, 60 + i*50 + 2))
-            # Then draw main text
-            surf.blit(text, (CARD_WIDTH//2 - text.get_width()//2, 60 + i*50))
+    def update(self):
+        # Update glow effect
+        self.glow_phase = (self.glow_phase + 0.05) % (2 * math.pi)
 
 
 
@@ -217,8 +842,14 @@ class TarotCard:
 
 
 class TarotGame:
-    def __init__(self):
-        self.deck = full_deck.copy()
+    def __init__(self, seed=None, width=WIDTH, height=HEIGHT):
+        # Every shuffle and reversal comes from the seeded deck engine, so a recorded seed reproduces a session
+        self.deck_engine = DeckEngine(seed)
+        self.seed = self.deck_engine.seed
+        self.rng = random.Random(self.seed)  # For the glow phases
+        self.width, self.height = width, height  # Size of the surface (or viewport) the game draws on
+        self.surface = None  # Surface the last frame was drawn on
+        self.deck = self.deck_engine.new_deck()
         self.drawn_cards = []
         self.current_spread = SPREAD_SINGLE
         self.reading_data = None
@@ -227,145 +858,142 @@ class TarotGame:
         self.showing_meaning = False
         self.selected_card = None
         self.time = 0
+        self.frame = 0  # Frames drawn, the clock for the deal-in animation
+        self.next_deal_frame = 0  # Earliest frame the next card may leave the deck
         self.button_hover = None
         self.crystal_ball_img = None
         self.ai_response = None
+        self.ai_interpretation = None  # ai_response parsed into per-position sections
+        self.ai_future = None  # Pending AI request for the current reading
+        self.ai_revision = None  # (redrawn positions, interpretation they replace sections of) while re-reading
+        self.ai_requested = False  # Whether the user has asked to see it
+        self.ai_message = None  # Status message to show with the interpretation
+        # Start interpreting as soon as cards are dealt, hiding the API latency
+        self.prefetch_ai = os.getenv("TAROT_PREFETCH_AI", "0") == "1"
+        self.interpreter = get_interpreter()
+        self.ai_scheduler = ai_scheduler
+        self.recorder = None  # SessionRecorder from tarot_replay, when recording
+        self.recorded_deals = None  # In a replay: (deck seed, card name) -> frame its deal-in started on
         self.showing_ai_response = False
-        
-        self.spread_positions = {
-            SPREAD_SINGLE: [(WIDTH//2, HEIGHT//2 - 100)],
-            SPREAD_THREE: [
-                (WIDTH//4, HEIGHT//2 - 100), 
-                (WIDTH//2, HEIGHT//2 - 100), 
-                (3*WIDTH//4, HEIGHT//2 - 100)
-            ],
-            SPREAD_CELTIC: [
-                (WIDTH//2, HEIGHT//3),                    # 1 - Present (center top)
-                (WIDTH//2, 2*HEIGHT//3),                 # 2 - Challenge (center bottom)
-                (WIDTH//4, HEIGHT//3 - CARD_HEIGHT//2),  # 3 - Past (left of 1, moved up)
-                (3*WIDTH//4, HEIGHT//3 - CARD_HEIGHT//2),# 4 - Future (right of 1, moved up)
-                (WIDTH//4, HEIGHT//2),                   # 5 - Above (left middle)
-                (3*WIDTH//4, HEIGHT//2),                 # 6 - Below (right middle)
-                (WIDTH//4, 2*HEIGHT//3 + CARD_HEIGHT//2),# 7 - Advice (left bottom, moved down)
-                (3*WIDTH//4, 2*HEIGHT//3 + CARD_HEIGHT//2), # 8 - External (right bottom, moved down)
-                (WIDTH//6, HEIGHT//2),                   # 9 - Hopes/Fears (far left)
-                (5*WIDTH//6, HEIGHT//2)                  # 10 - Outcome (far right)
-            ]
-        }
-        self.spread_names = {
-            SPREAD_SINGLE: ["Current Situation"],
-            SPREAD_THREE: ["Past", "Present", "Future"],
-            SPREAD_CELTIC: [
-                "1 - Present", "2 - Challenge", "3 - Past", "4 - Future",
-                "5 - Above", "6 - Below", "7 - Advice", "8 - External",
-                "9 - Hopes/Fears", "10 - Outcome"
-            ]
-        }
-        # Try to load crystal ball image
-        try:
-            self.crystal_ball_img = pygame.image.load("crystal_ball.png")
-            self.crystal_ball_img = pygame.transform.scale(self.crystal_ball_img, (200, 200))
-        except:
-            self.crystal_ball_img = None
+        self.text_panels = SurfaceCache("text panels", surface_stats)  # Laid-out AI and meaning text
+        self.ai_box_surf = None
+        self.meaning_box_surf = None
+        self.show_surface_stats = False
+        self.saved_docs = []  # Index entries of the current reading, kept out of its own matches
+        self.similar_readings = None  # Lines for the Similar Readings overlay, while it is shown
+        self.scroll_targets = []  # (rect, panel) pairs drawn this frame, for the mouse wheel
+        self.mouse_pos = (0, 0)  # Mouse state for this frame, set by the main loop (or a replay)
+        self.mouse_pressed = False
+        
+        self.spread_positions = get_spread_layouts(width, height)
+        self.spread_names = SPREAD_NAMES
+        self.background = get_background(width, height)
+        self.crystal_ball_img = load_crystal_ball()
 
 
     def get_ai_reading(self):
-        """Send the current reading to OpenAI and get a mystical interpretation"""
+        """Ask the AI for a mystical interpretation of the current reading.
+        
+        The request runs in the background; poll_ai_reading picks up the answer.
+        If it was already prefetched when the cards were dealt, it shows at once.
+        """
         if not self.current_cards:
             self.message = "No reading to interpret! Draw cards first."
             return False
         
-        try:
-            # Prepare the reading data for the AI
-            reading_data = self.get_reading_data()
-            if not reading_data:
-                self.message = "Could not prepare reading data."
-                return False
-            
-            # Format the prompt
-            prompt = (
-                f"Act as a mystical tarot card reader. Interpret this {reading_data['spread_type']} spread:\n\n"
-            )
-            
-            for card in reading_data['cards']:
-                prompt += (
-                    f"Position: {card['position']}\n"
-                    f"Card: {card['card_name']} ({'Reversed' if card['reversed'] else 'Upright'})\n"
-                    f"Meaning: {card['meaning']}\n\n"
-                )
-            
-            prompt += (
-                "\n\n"
-                "||| STRICT FORMATTING COMMANDS |||\n\n"
-                "1. **MANDATORY SPACING FORMAT**:\n"
-                "[NEWLINE][NEWLINE]\n"
-                "[EMOJI] [Position#] - [Position Name]: [Card Name] (Upright/Reversed)[NEWLINE]\n"
-                "[Interpretation paragraph 1][NEWLINE]\n"
-                "[Interpretation paragraph 2][NEWLINE]\n"
-                "[NEWLINE]\n\n"
-                "2. **INTERPRETATION STRUCTURE**:\n"
-                "- First line: Core meaning (complete sentence)\n"
-                "- Second line: Practical implications\n"
-                "- Third line: Intuitive message\n"
-                "- Fourth line: Connection to other cards\n\n"
-                "3. **FINAL REFLECTION FORMAT**:\n"
-                "[NEWLINE][NEWLINE]\n"
-                "🔮 Final Reflection:[NEWLINE]\n"
-                "[Paragraph 1][NEWLINE]\n"
-                "[Paragraph 2][NEWLINE]\n"
-                "[Closing statement][NEWLINE]\n"
-                "[NEWLINE]\n\n"
-                
-                "and return the output in bullet points as below:\n\n"
-                "=== EXAMPLE OF REQUIRED OUTPUT ===\n\n"
-                "🌟 1 - Present: 4 of Wands (Reversed)\n"
-                "You're in a phase where what should feel stable or celebratory—like home, relationships, or creative achievements—feels instead disrupted. This card reversed speaks of conflict within a familiar structure, perhaps tension in a home, team, or partnership. You may be transitioning away from what once brought you comfort, or feeling unsupported as you try to move forward.\n\n"
-                "⚔️ 2 - Challenge: 2 of Cups (Reversed)\n"
-                "Your biggest challenge right now is a breakdown in communication or emotional connection with someone important. A partnership or relationship is out of balance—maybe romantic, maybe a close friend or ally. Mistrust or misunderstandings may be at play, and healing this rift could be central to your current struggle.\n\n"
-                "⏳ 3 - Past: 6 of Cups (Reversed)\n"
-                "You've recently been forced to let go of the past—perhaps a memory, old pattern, or nostalgia was holding you back. Whether it was comforting or painful, you’re now in the process of moving forward. This is a sign of emotional growth, though not without discomfort.\n\n"
-                "🌑 4 - Future: The Moon (Upright)\n"
-                "What’s coming next may feel uncertain or disorienting. The Moon brings confusion, illusions, and hidden truths—things are not what they appear. You will need to rely on intuition, dreams, and your inner compass to navigate what lies ahead. Don't act on fear or illusion—seek clarity in the fog.\n\n"
-                "☁️ 5 - Above (Conscious Goal): 6 of Wands (Reversed)\n"
-                "You're struggling with recognition and validation. You might feel that your efforts go unnoticed, or you fear failure and public judgment. This card can also point to ego wounds—perhaps you want to win or be seen, but fear losing face. It’s a reminder that true success comes from within, not applause.\n\n"
-                "🧑‍🤝‍🧑 6 - Below (Unconscious Influence): 3 of Cups (Upright)\n"
-                "At a deeper level, you crave connection, joy, and genuine friendship. There's a strong desire to belong and be celebrated with others—even if recent events have made you feel isolated. This unconscious influence may be guiding you to seek a new sense of community or re-establish joyful bonds.\n\n"
-                "🌀 7 - Advice: The World (Reversed)\n"
-                "You're being asked to complete what you’ve left unfinished. There’s a cycle in your life—emotional, spiritual, or literal—that hasn’t come to full closure. Fear of change, fear of endings, or feeling like something’s missing is blocking your progress. It’s time to gather your strength and see the journey through.\n\n"
-                "💨 8 - External Influences: Knight of Swords (Upright)\n"
-                "Your environment is fast-moving and intense, with people or events pushing you toward rapid decisions. Someone around you may be aggressive in their opinions or rushing things. Be wary of impulsive actions—both your own and others'. Stay grounded as you navigate this external pressure.\n\n"
-                "💖 9 - Hopes/Fears: 10 of Cups (Upright)\n"
-                "At your core, you long for peace, harmony, and emotional fulfillment, particularly within your home or family life. This card speaks to the dream of deep connection, support, and love. But since this is also in your fears, perhaps you’re afraid it may never come—or that you’ll sabotage it. It’s a beautiful vision, but you may fear it's just out of reach.\n\n"
-                "🌱 10 - Outcome: 7 of Pentacles (Upright)\n"
-                "Your outcome suggests growth, but not overnight. This is a card of patient progress—planting seeds and watching them slowly bear fruit. Your effort will pay off, but only if you assess your investments wisely. This may not be a dramatic resolution, but it’s a solid one: a future earned through care, consistency, and self-evaluation.\n\n"
-                "🔮 Final Reflection:\n"
-                "This spread tells the story of someone in emotional transition—between letting go of the past, confronting a broken bond or relationship, and walking a foggy, uncertain path forward. You're being invited to face illusions, finish old cycles, and trust your intuition. While it may feel like support is lacking now, the foundation for lasting growth, healing, and joyful connection is already within reach—you just have to be willing to do the patient work, and close what needs closing.\n\n"
-                "The cards encourage you to face these challenges directly...\n"
-                "Remember: Growth often comes through discomfort.\n"
-            )
-
-            
-            # Updated OpenAI API call
-            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a wise, mystical tarot reader with deep intuitive powers. Provide insightful, poetic interpretations of tarot readings."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            self.ai_response = response.choices[0].message.content
-            self.showing_ai_response = True
-            self.message = "Received mystical interpretation from the AI."
+        self.ai_requested = True
+        if self.ai_interpretation:
+            self.show_interpretation()
             return True
-            
-        except Exception as e:
-            self.message = f"Failed to get AI reading: {str(e)}"
+        
+        if self.ai_future is not None:
+            self.message = "Still consulting the spirits..."
+            return True
+        
+        if not self.start_ai_request():
+            self.message = "Could not prepare reading data."
             return False
+        self.message = "Consulting the spirits..."
+        return True
+
+
+
+    def start_ai_request(self):
+        """Send the current reading to the interpreter in the background"""
+        # Prepare the reading data for the AI
+        reading_data = self.get_reading_data()
+        if not reading_data:
+            return False
+        if self.ai_revision is not None:
+            reading_data["revise"] = self.ai_revision[0]
+        self.ai_future = request_interpretation(self.ai_scheduler, self.interpreter, reading_data)
+        return True
+
+
+
+    def poll_ai_reading(self):
+        """Pick up a finished AI request; called once per frame.
+        
+        A prefetched answer is held until the user asks for it.
+        """
+        if self.ai_future is None or not self.ai_future.done():
+            return
+        
+        future, self.ai_future = self.ai_future, None
+        if self.recorder:
+            self.recorder.record_ai(future.reading_data, future)
+        try:
+            self.ai_response = future.result()
+        except Exception as e:
+            # A failed prefetch is dropped quietly; asking again will retry it
+            if self.ai_requested:
+                self.message = f"Failed to get AI reading: {str(e)}"
+            return
+        
+        if self.ai_revision is not None:
+            # Only the redrawn positions and the reflection were re-read; the rest is kept
+            revised, previous = self.ai_revision
+            self.ai_revision = None
+            self.ai_interpretation = merge_revision(previous, self.ai_response, revised)
+            self.ai_response = self.ai_interpretation.raw
+        else:
+            self.ai_interpretation = parse_ai_response(self.ai_response, self.spread_names[self.current_spread])
+        if future.errors:
+            self.ai_message = f"AI unavailable ({future.errors[-1]}); used the {future.backend} interpretation."
+        elif self.ai_interpretation.missing_positions:
+            self.ai_message = f"Interpretation is missing: {', '.join(self.ai_interpretation.missing_positions)}"
+        else:
+            self.ai_message = "Received mystical interpretation from the AI."
+        
+        if self.ai_requested:
+            self.show_interpretation()
+
+
+
+    def show_interpretation(self):
+        self.showing_ai_response = True
+        self.message = self.ai_message
+
+
+
+    def toggle_prefetch(self):
+        """Turn speculative AI requests on deal on or off"""
+        self.prefetch_ai = not self.prefetch_ai
+        self.message = f"AI prefetch on deal is now {'on' if self.prefetch_ai else 'off'}."
+
+
+
+
+
+
+    def cycle_interpreter(self):
+        """Switch to the next interpretation backend (or fallback chain)"""
+        try:
+            index = INTERPRETER_CHOICES.index(self.interpreter.name)
+        except ValueError:
+            index = -1
+        self.interpreter = get_interpreter(INTERPRETER_CHOICES[(index + 1) % len(INTERPRETER_CHOICES)])
+        self.message = f"Interpretations now come from: {self.interpreter.name.replace(',', ', then ')}"
 
 
 
@@ -374,27 +1002,41 @@ class TarotGame:
 
     def reset_deck(self):
         """Completely reset the deck to full 78 cards and shuffle"""
-        self.deck = full_deck.copy()  # Restore all 78 cards
+        self.deck = self.deck_engine.new_deck()  # Restore all 78 cards, shuffled
         self.drawn_cards = []  # Clear drawn cards history
-        random.shuffle(self.deck)  # Shuffle the fresh deck
         self.message = "Deck has been reset to 78 cards and shuffled."
 
     def shuffle_deck(self):
         """Reset to full 78-card deck, clear current reading, and shuffle"""
-        self.deck = full_deck.copy()
+        self.deck = self.deck_engine.new_deck()
         self.drawn_cards = []
         self.current_cards = []  # Clear any displayed cards
-        random.shuffle(self.deck)
+        self.clear_interpretation()
         self.message = "Deck reset to 78 cards and shuffled. Current reading cleared."
         self.showing_meaning = False  # Hide any card meaning being shown
         self.selected_card = None  # Deselect any selected card
 
+    def clear_interpretation(self):
+        """Drop the AI interpretation once the cards it describes are gone"""
+        if self.ai_future is not None:
+            self.ai_future.cancel_request()
+        self.ai_response = None
+        self.ai_interpretation = None
+        self.ai_future = None
+        self.ai_revision = None
+        self.ai_requested = False
+        self.showing_ai_response = False
+        self.text_panels.clear()
+        self.saved_docs = []
+        self.similar_readings = None
+
     def draw_card(self):
         if not self.deck:
             self.reset_deck()
             
-        card_name = self.deck.pop()
-        card = TarotCard(card_name)
+        card_name, reversed = self.deck.pop()
+        card = TarotCard(card_name, self.rng, reversed)
+        card.deck_seed = self.deck.seed
         self.drawn_cards.append(card)
         return card
 
@@ -406,54 +1048,82 @@ class TarotGame:
         # Always reset and shuffle the deck before each new reading
         self.reset_deck()
         
+        # Dealing is just bookkeeping; the faces are prepared in the background and fly in when ready
         for _ in range(len(positions)):
             self.current_cards.append(self.draw_card())
+        for card in self.current_cards:
+            card_face_loader.request(card.name)
+        self.next_deal_frame = self.frame
+        self.clear_interpretation()
+        if self.prefetch_ai:
+            self.start_ai_request()
         
         self.message = f"Drew {len(positions)} cards for {self.get_spread_name(spread_type)} spread."
 
+    def redraw_position(self, index):
+        """Replace the card in one position with the next card from the deck, keeping the rest of the spread.
+        
+        If the reading was already interpreted, only the new card and the final
+        reflection are sent to the AI; the other positions keep their sections.
+        """
+        if not self.deck:
+            self.message = "No cards left in the deck to redraw from."
+            return
+        
+        old_card = self.current_cards[index]
+        card = self.draw_card()
+        self.current_cards[index] = card
+        card_face_loader.request(card.name)
+        self.next_deal_frame = max(self.next_deal_frame, self.frame)
+        if self.selected_card is old_card:
+            self.selected_card = card
+        position = self.spread_names[self.current_spread][index]
+        
+        # A re-read still on its way is restarted with this position added
+        previous, revised = self.ai_interpretation, []
+        if previous is None and self.ai_revision is not None:
+            revised, previous = self.ai_revision
+        pending, requested = self.ai_future is not None, self.ai_requested
+        self.clear_interpretation()
+        self.ai_requested = requested
+        if previous is not None:
+            self.ai_revision = (revised + [position] if position not in revised else revised, previous)
+            self.start_ai_request()
+        elif pending or self.prefetch_ai:
+            self.start_ai_request()  # The full reading still on its way, now of the new cards
+        
+        self.message = f"Redrew {position}: {card.name}."
+
     def get_spread_name(self, spread_type):
-        if spread_type == SPREAD_SINGLE:
-            return "Single Card"
-        elif spread_type == SPREAD_THREE:
-            return "Past-Present-Future"
-        else:
-            return "Celtic Cross"
+        return get_spread_name(spread_type)
 
 
 
 
 
     def draw(self, screen):
+        self.frame += 1
+        self.poll_ai_reading()
+        
         # Draw background
-        screen.blit(background, (0, 0))
+        self.surface = screen
+        screen.blit(self.background, (0, 0))
+        self.scroll_targets = []
         
 
         
         # Draw title with fancy effects
-        title_text = title_font.render("Mystic Tarot Reader", True, WHITE)
-        shadow_text = title_font.render("Mystic Tarot Reader", True, (0, 0, 0, 150))
-        
-        # Create a glowing effect behind the title
-        title_glow = pygame.Surface((title_text.get_width() + 40, title_text.get_height() + 40), pygame.SRCALPHA)
-        glow_radius = 20 + 5 * math.sin(self.time * 2)
-        for r in range(int(glow_radius), 0, -1):
-            alpha = int(50 * (r / glow_radius))
-            pygame.draw.rect(title_glow, (*LIGHT_PURPLE, alpha), 
-                            (20 - r, 20 - r, title_text.get_width() + 2*r, title_text.get_height() + 2*r), 
-                            border_radius=10)
-        
-        screen.blit(title_glow, (WIDTH//2 - title_glow.get_width()//2, 20))
-        screen.blit(shadow_text, (WIDTH//2 - title_text.get_width()//2 + 3, 40 + 3))
-        screen.blit(title_text, (WIDTH//2 - title_text.get_width()//2, 40))
+        draw_title(screen, self.width, self.time)
         
         # Draw deck status with crystal ball icon
-        deck_status = small_font.render(f"Cards left: {len(self.deck)}", True, WHITE)
+        deck_status = render_text(small_font, f"Cards left: {len(self.deck)}", WHITE)
         if self.crystal_ball_img:
-            crystal_ball_glow = pygame.Surface((self.crystal_ball_img.get_width(), 
-                                                self.crystal_ball_img.get_height()), pygame.SRCALPHA)
-            glow_alpha = 50 + int(50 * math.sin(self.time * 3))
-            crystal_ball_glow.fill((*LIGHT_PURPLE, glow_alpha))
-            screen.blit(crystal_ball_glow, (30 - 10, 30 - 10), special_flags=pygame.BLEND_ADD)
+            if effects:
+                crystal_ball_glow = surface_stats.new_surface((self.crystal_ball_img.get_width(), 
+                                                               self.crystal_ball_img.get_height()), pygame.SRCALPHA, "glow")
+                glow_alpha = 50 + int(50 * math.sin(self.time * 3))
+                crystal_ball_glow.fill((*LIGHT_PURPLE, glow_alpha))
+                screen.blit(crystal_ball_glow, (30 - 10, 30 - 10), special_flags=pygame.BLEND_ADD)
             screen.blit(self.crystal_ball_img, (30, 30))
             screen.blit(deck_status, (30 + self.crystal_ball_img.get_width() + 15, 
                                     30 + self.crystal_ball_img.get_height()//2 - deck_status.get_height()//2))
@@ -464,7 +1134,7 @@ class TarotGame:
         if self.message:
             msg_width = font.size(self.message)[0] + 40
             msg_height = 50
-            msg_surface = pygame.Surface((msg_width, msg_height), pygame.SRCALPHA)
+            msg_surface = surface_stats.new_surface((msg_width, msg_height), pygame.SRCALPHA, "message")
             
             # Create parchment-like background
             msg_surface.fill((220, 210, 180, 200))
@@ -472,14 +1142,14 @@ class TarotGame:
             
 
             
-            msg_text = font.render(self.message, True, DARK_PURPLE)
+            msg_text = render_text(font, self.message, DARK_PURPLE)
             msg_surface.blit(msg_text, (msg_width//2 - msg_text.get_width()//2, 
                                         msg_height//2 - msg_text.get_height()//2))
             
-            screen.blit(msg_surface, (WIDTH//2 - msg_width//2, 120))
+            screen.blit(msg_surface, (self.width//2 - msg_width//2, 120))
         
         # Draw buttons with fancy hover effects
-        button_y = HEIGHT - 120
+        button_y = self.height - 120
         button_width = 200
         button_height = 70
         button_spacing = 220
@@ -493,11 +1163,11 @@ class TarotGame:
             ("AI Reading", 5, self.get_ai_reading)
         ]
         
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = self.mouse_pos
         self.button_hover = None
         
         for i, (text, pos, action) in enumerate(buttons):
-            button_x = WIDTH//2 - (button_spacing * len(buttons))//2 + pos * button_spacing
+            button_x = self.width//2 - (button_spacing * len(buttons))//2 + pos * button_spacing
             
             # Check hover state
             hover = (button_x <= mouse_pos[0] <= button_x + button_width and 
@@ -507,11 +1177,11 @@ class TarotGame:
                 self.button_hover = i
             
             # Draw button with hover effects
-            button_surf = pygame.Surface((button_width, button_height), pygame.SRCALPHA)
+            button_surf = surface_stats.new_surface((button_width, button_height), pygame.SRCALPHA, "buttons")
             
             if hover:
                 # Hover state - glowing button
-                for r in range(15, 0, -1):
+                for r in range(15 if effects else 0, 0, -1):
                     alpha = 50 - r * 3
                     pygame.draw.rect(button_surf, (*GOLD, alpha), 
                                     (button_width//2 - r*10, button_height//2 - r*5, r*20, r*10), 
@@ -525,11 +1195,11 @@ class TarotGame:
                 pygame.draw.rect(button_surf, GOLD, (0, 0, button_width, button_height), 3, border_radius=10)
             
             # Draw button text
-            text_surf = small_font.render(text, True, WHITE)
-            shadow_surf = small_font.render(text, True, (0, 0, 0, 150))
-            
-            button_surf.blit(shadow_surf, (button_width//2 - text_surf.get_width()//2 + 2, 
-                                            button_height//2 - text_surf.get_height()//2 + 2))
+            text_surf = render_text(small_font, text, WHITE)
+            if effects:
+                shadow_surf = render_text(small_font, text, (0, 0, 0, 150))
+                button_surf.blit(shadow_surf, (button_width//2 - text_surf.get_width()//2 + 2, 
+                                                button_height//2 - text_surf.get_height()//2 + 2))
             button_surf.blit(text_surf, (button_width//2 - text_surf.get_width()//2, 
                                         button_height//2 - text_surf.get_height()//2))
             
@@ -543,13 +1213,27 @@ class TarotGame:
             for i, (card, pos) in enumerate(zip(self.current_cards, positions)):
                 # Update card animations
                 card.update()
-                
-                # Draw card with glow effect if selected
                 x, y = pos
-                if card == self.selected_card:
+                
+                # Hold the slot until the card has been dealt in
+                progress = self.deal_progress(card)
+                if progress is None or progress < 1:
+                    draw_card_slot(screen, card_placeholder, pos, names[i], card.reversed)
+                    if progress is not None:
+                        eased = 1 - (1 - progress) ** 3
+                        card_x = DEAL_FROM[0] + (x - DEAL_FROM[0]) * eased
+                        card_y = DEAL_FROM[1] + (y - DEAL_FROM[1]) * eased
+                        screen.blit(card.image, (card_x - CARD_WIDTH//2, card_y - CARD_HEIGHT//2))
+                    continue
+                
+                # Draw card with glow effect if selected (just an outline with effects off)
+                if card == self.selected_card and not effects:
+                    pygame.draw.rect(screen, GOLD, (x - CARD_WIDTH//2 - 6, y - CARD_HEIGHT//2 - 6,
+                                                    CARD_WIDTH + 12, CARD_HEIGHT + 12), 4, border_radius=15)
+                elif card == self.selected_card:
                     # Create a pulsing glow effect
                     glow_intensity = 0.5 + 0.5 * math.sin(card.glow_phase)
-                    glow_surf = pygame.Surface((CARD_WIDTH + 40, CARD_HEIGHT + 40), pygame.SRCALPHA)
+                    glow_surf = surface_stats.new_surface((CARD_WIDTH + 40, CARD_HEIGHT + 40), pygame.SRCALPHA, "glow")
                     for r in range(20, 0, -1):
                         alpha = int(50 * glow_intensity * (r / 20))
                         pygame.draw.rect(glow_surf, (*GOLD, alpha), 
@@ -557,36 +1241,13 @@ class TarotGame:
                                         border_radius=15)
                     screen.blit(glow_surf, (x - CARD_WIDTH//2 - 20, y - CARD_HEIGHT//2 - 20))
                 
-                # Draw card with subtle shadow
-                shadow_offset = 10
-                shadow_surf = pygame.Surface((CARD_WIDTH, CARD_HEIGHT), pygame.SRCALPHA)
-                shadow_surf.fill((0, 0, 0, 100))
-                screen.blit(shadow_surf, (x - CARD_WIDTH//2 + shadow_offset, y - CARD_HEIGHT//2 + shadow_offset))
-                
-                # Draw the actual card with slight hover effect
+                # Draw the card with a slight hover effect
                 hover_effect = 0
                 if (x - CARD_WIDTH//2 <= mouse_pos[0] <= x + CARD_WIDTH//2 and 
                     y - CARD_HEIGHT//2 <= mouse_pos[1] <= y + CARD_HEIGHT//2):
                     hover_effect = -10 * math.sin(self.time * 5)
                 
-                screen.blit(card.image, (x - CARD_WIDTH//2, y - CARD_HEIGHT//2 + hover_effect))
-                
-                # Draw position name with fancy styling
-                name_bg = pygame.Surface((200, 40), pygame.SRCALPHA)
-                pygame.draw.rect(name_bg, (*DARK_PURPLE, 200), (0, 0, 200, 40), border_radius=10)
-                pygame.draw.rect(name_bg, GOLD, (0, 0, 200, 40), 2, border_radius=10)
-                
-                name_text = small_font.render(names[i], True, WHITE)
-                name_bg.blit(name_text, (100 - name_text.get_width()//2, 20 - name_text.get_height()//2))
-                
-                screen.blit(name_bg, (x - 100, y + CARD_HEIGHT//2 + 20))
-                
-                if card.reversed:
-                    rev_text = small_font.render("(Reversed)", True, (255, 100, 100))
-                    rev_bg = pygame.Surface((rev_text.get_width() + 20, rev_text.get_height() + 10), pygame.SRCALPHA)
-                    pygame.draw.rect(rev_bg, (*DARK_PURPLE, 200), (0, 0, rev_bg.get_width(), rev_bg.get_height()), border_radius=5)
-                    rev_bg.blit(rev_text, (10, 5))
-                    screen.blit(rev_bg, (x - rev_bg.get_width()//2, y + CARD_HEIGHT//2 + 70))
+                draw_card_slot(screen, card.image, pos, names[i], card.reversed, hover_effect)
         
         # Draw meaning if showing
         if self.showing_meaning and self.selected_card:
@@ -598,129 +1259,201 @@ class TarotGame:
             if self.draw_ai_response_box(screen):
                 self.showing_ai_response = False
 
+        if self.similar_readings is not None:
+            self.draw_similar_readings(screen)
+
+        if self.show_surface_stats:
+            self.draw_surface_stats(screen)
+
 
 
 
 
 
 
+    def deal_progress(self, card):
+        """How far a card's deal-in animation has got (0 to 1), or None before it leaves the deck"""
+        if card.deal_frame is None:
+            key = (card.deck_seed, card.name)
+            if self.recorded_deals and key in self.recorded_deals:
+                # Replaying: deal on the recorded frame, however long the face takes to build this time
+                card.deal_frame = self.recorded_deals.pop(key)
+            else:
+                # The face is ready whenever the worker finishes, so the frame depends on the clock
+                if card_face_loader.ready(card.name) is None:
+                    return None
+                # Cards leave the deck one after another, even when their faces are ready together
+                card.deal_frame = max(self.frame, self.next_deal_frame)
+                if self.recorder:
+                    self.recorder.event("deal", deck_seed=card.deck_seed, name=card.name, deal_frame=card.deal_frame)
+            self.next_deal_frame = card.deal_frame + DEAL_STAGGER
+        if self.frame < card.deal_frame:
+            card_face_loader.ready(card.name)  # Keeps its face cached while it waits its turn
+            return None
+        if self.recorded_deals is not None and self.frame - card.deal_frame < DEAL_FRAMES:
+            card_face_loader.wait(card.name)  # In flight on this frame live, so it must be ready here too
+        return min(1, (self.frame - card.deal_frame) / DEAL_FRAMES)
+    
+    
+    
+    def draw_surface_stats(self, screen):
+        """Overlay the surface memory report in the bottom-left corner (toggled with F3)"""
+        lines = surface_stats.report().split("\n")
+        y = self.height - 20 - 22 * len(lines)
+        for line in lines:
+            text = surface_stats.render(stats_font, line, WHITE, "stats overlay")
+            screen.blit(text, (20, y))
+            y += 22
+    
+    
+    
+    def toggle_effects(self):
+        """Turn the glow and shadow effects on or off"""
+        global effects
+        effects = not effects
+        self.message = f"Glow and shadow effects are now {'on' if effects else 'off'}."
+    
+    
+    
+    def toggle_surface_stats(self):
+        self.show_surface_stats = not self.show_surface_stats
+    
+    
+    
+    def reload_cards(self, changed):
+        """Show edited card meanings on the table at once; their faces are rebuilt by the face loader"""
+        for card in self.current_cards:
+            if card.name in changed:
+                card.load_meanings()
+        for key in [key for key in self.text_panels.entries if key[0] in changed]:
+            self.text_panels.pop(key)
+        if len(changed) <= 3:
+            self.message = f"Reloaded {', '.join(sorted(changed))}."
+        else:
+            self.message = f"Reloaded {len(changed)} cards."
+    
+    
+    
+    def toggle_similar_readings(self):
+        """Show or hide the saved readings most like the current one (S)"""
+        if self.similar_readings is not None:
+            self.similar_readings = None
+            return
+        reading = self.get_reading_data()
+        if reading is None:
+            self.message = "No reading to compare! Draw cards first."
+            return
+        if self.ai_interpretation:
+            reading["interpretation"] = self.ai_interpretation.to_dict()
+        
+        index = get_reading_index()
+        matches = index.search(reading, SIMILAR_READINGS, exclude=self.saved_docs)
+        current = {(card["card_name"], card["reversed"]) for card in reading["cards"]}
+        self.similar_readings = []
+        for doc, score in matches:
+            past = index.reading(doc)
+            shared = [f"{card['card_name']}{' (R)' if card['reversed'] else ''}" for card in past["cards"]
+                      if (card["card_name"], card["reversed"]) in current]
+            line = f"{score:.0%}  {past.get('saved_at', '').replace('T', ' ')[:16]}  {past['spread_type']}"
+            if shared:
+                line += f"  -  shares {', '.join(shared)}"
+            self.similar_readings.append(line)
+        if matches:
+            self.message = f"The {len(matches)} saved readings most like this one (of {index.count})."
+        else:
+            self.message = "No similar readings saved yet."
+    
+    def draw_similar_readings(self, screen):
+        """Overlay the Similar Readings list below the message bar"""
+        if not self.similar_readings:
+            return
+        lines = [render_text(small_font, line, GOLD) for line in self.similar_readings]
+        panel_width = max(text.get_width() for text in lines) + 40
+        panel_height = 36 * len(lines) + 20
+        panel = surface_stats.new_surface((panel_width, panel_height), pygame.SRCALPHA, "similar readings")
+        panel.fill((40, 5, 60, 220))
+        pygame.draw.rect(panel, GOLD, (0, 0, panel_width, panel_height), 2)
+        for i, text in enumerate(lines):
+            panel.blit(text, (20, 10 + 36 * i))
+        screen.blit(panel, (self.width//2 - panel_width//2, 190))
+
+
+
     def draw_ai_response_box(self, screen):
         """Draw the AI interpretation in a fancy box with proper section breaks"""
-        if not self.ai_response:
+        if not self.ai_interpretation:
             return False
             
         # Box dimensions
-        box_width = min(1500, WIDTH - 100)
-        box_height = min(1500, HEIGHT - 200)
-        box_x = (WIDTH - box_width) // 2
-        box_y = (HEIGHT - box_height) // 2
-        
-        # Create ornate background
-        box_surf = pygame.Surface((box_width, box_height), pygame.SRCALPHA)
-        
-        # Main parchment background with gradient
-        for y in range(box_height):
-            ratio = y / box_height
-            r = int(240 - 30 * ratio)
-            g = int(230 - 40 * ratio)
-            b = int(210 - 30 * ratio)
-            pygame.draw.line(box_surf, (r, g, b, 240), (0, y), (box_width, y))
-        
-        # Add decorative border
-        pygame.draw.rect(box_surf, DARK_GOLD, (0, 0, box_width, box_height), 5, border_radius=15)
-        
-        # Add mystical symbols in corners
-        corner_size = 30
-        for x, y in [(0, 0), (box_width, 0), (0, box_height), (box_width, box_height)]:
-            if x == 0 and y == 0:  # Top-left - moon symbol
-                pygame.draw.circle(box_surf, DARK_GOLD, (corner_size//2, corner_size//2), corner_size//3, 2)
-                pygame.draw.arc(box_surf, DARK_GOLD, 
-                            (corner_size//6, corner_size//6, 2*corner_size//3, 2*corner_size//3),
-                            math.pi/2, 3*math.pi/2, 2)
-            elif x == box_width and y == 0:  # Top-right - sun symbol
-                pygame.draw.circle(box_surf, DARK_GOLD, (box_width-corner_size//2, corner_size//2), corner_size//3, 2)
-                for i in range(8):
-                    angle = i * math.pi/4
-                    end_x = box_width-corner_size//2 + (corner_size//3 + 5) * math.cos(angle)
-                    end_y = corner_size//2 + (corner_size//3 + 5) * math.sin(angle)
-                    pygame.draw.line(box_surf, DARK_GOLD,
-                                (box_width-corner_size//2, corner_size//2),
-                                (end_x, end_y), 2)
-        
-        # Draw the surface to screen
-        screen.blit(box_surf, (box_x, box_y))
-        
-        # Draw title
-        title = title_font.render("Mystical Interpretation", True, DARK_PURPLE)
-        screen.blit(title, (box_x + box_width//2 - title.get_width()//2, box_y + 20))
-        
-        # Process and render text with emoji breaks
-        emoji_list = ["🌟", "⚔️", "⏳", "🌑", "☁️", "🧑‍🤝‍🧑", "🌀", "💨", "💖", "🌱", "🔮"]
-        sections = []
-        current_section = ""
-        
-        # Split text at emojis while keeping them
-        for char in self.ai_response:
-            if char in emoji_list:
-                if current_section:
-                    sections.append(current_section)
-                    current_section = ""
-            current_section += char
-        if current_section:
-            sections.append(current_section)
-        
-        # Render each section with proper spacing
-        line_height = 30
-        max_lines = (box_height - 100) // line_height
-        current_y = box_y + 80
-        lines_rendered = 0
-        
-        for section in sections:
-            # Skip empty sections
-            if not section.strip():
-                continue
-                
-            # Split section into words
-            words = section.split()
-            current_line = ""
+        box_width = min(1500, self.width - 100)
+        box_height = min(1500, self.height - 200)
+        box_x = (self.width - box_width) // 2
+        box_y = (self.height - box_height) // 2
+        
+        # The parchment, corners and title never change, so build them once per box size
+        if self.ai_box_surf is None or self.ai_box_surf.get_size() != (box_width, box_height):
+            # Create ornate background
+            box_surf = pygame.Surface((box_width, box_height), pygame.SRCALPHA)
             
-            # Word wrapping logic
-            for word in words:
-                test_line = current_line + word + " "
-                if font.size(test_line)[0] < box_width - 40:
-                    current_line = test_line
-                else:
-                    if lines_rendered >= max_lines:
-                        break
-                    text = font.render(current_line, True, DARK_PURPLE)
-                    screen.blit(text, (box_x + 20, current_y))
-                    current_y += line_height
-                    lines_rendered += 1
-                    current_line = word + " "
+            # Main parchment background with gradient
+            for y in range(box_height):
+                ratio = y / box_height
+                r = int(240 - 30 * ratio)
+                g = int(230 - 40 * ratio)
+                b = int(210 - 30 * ratio)
+                pygame.draw.line(box_surf, (r, g, b, 240), (0, y), (box_width, y))
             
-            # Render remaining words
-            if current_line and lines_rendered < max_lines:
-                text = font.render(current_line, True, DARK_PURPLE)
-                screen.blit(text, (box_x + 20, current_y))
-                current_y += line_height
-                lines_rendered += 1
+            # Add decorative border
+            pygame.draw.rect(box_surf, DARK_GOLD, (0, 0, box_width, box_height), 5, border_radius=15)
             
-            # Add extra space between sections
-            if lines_rendered < max_lines and section != sections[-1]:
-                current_y += line_height // 2  # Half-line spacing
-                lines_rendered += 0.5
+            # Add mystical symbols in corners
+            corner_size = 30
+            for x, y in [(0, 0), (box_width, 0), (0, box_height), (box_width, box_height)]:
+                if x == 0 and y == 0:  # Top-left - moon symbol
+                    pygame.draw.circle(box_surf, DARK_GOLD, (corner_size//2, corner_size//2), corner_size//3, 2)
+                    pygame.draw.arc(box_surf, DARK_GOLD, 
+                                (corner_size//6, corner_size//6, 2*corner_size//3, 2*corner_size//3),
+                                math.pi/2, 3*math.pi/2, 2)
+                elif x == box_width and y == 0:  # Top-right - sun symbol
+                    pygame.draw.circle(box_surf, DARK_GOLD, (box_width-corner_size//2, corner_size//2), corner_size//3, 2)
+                    for i in range(8):
+                        angle = i * math.pi/4
+                        end_x = box_width-corner_size//2 + (corner_size//3 + 5) * math.cos(angle)
+                        end_y = corner_size//2 + (corner_size//3 + 5) * math.sin(angle)
+                        pygame.draw.line(box_surf, DARK_GOLD,
+                                    (box_width-corner_size//2, corner_size//2),
+                                    (end_x, end_y), 2)
+            
+            # Draw title
+            title = surface_stats.render(title_font, "Mystical Interpretation", DARK_PURPLE, "panel text")
+            box_surf.blit(title, (box_width//2 - title.get_width()//2, 20))
+            self.ai_box_surf = box_surf
+            surface_stats.hold((id(self), "ai box"), "panel backgrounds", box_surf)
+        
+        # Draw the surface to screen
+        screen.blit(self.ai_box_surf, (box_x, box_y))
+        
+        # Lay the interpretation out once; each frame only blits the visible slice
+        text_rect = pygame.Rect(box_x + 20, box_y + 80, box_width - 40, box_height - 150)
+        key = ("interpretation", id(self.ai_interpretation), text_rect.width)
+        panel = self.text_panels.get(key)
+        if panel is None:
+            panel = self.text_panels.put(key, ScrollPanel(self.interpretation_blocks(), font, DARK_PURPLE,
+                                                          text_rect.width, line_height=30))
+        panel.draw(screen, text_rect)
+        self.scroll_targets.append((text_rect, panel))
         
         # Draw close button
         close_button_y = box_y + box_height - 60
         close_button_x = box_x + box_width//2 - 100
         
         # Check hover state
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = self.mouse_pos
         hover = (close_button_x <= mouse_pos[0] <= close_button_x + 200 and 
                 close_button_y <= mouse_pos[1] <= close_button_y + 50)
         
         # Draw button
-        close_surf = pygame.Surface((200, 50), pygame.SRCALPHA)
+        close_surf = surface_stats.new_surface((200, 50), pygame.SRCALPHA, "buttons")
         if hover:
             pygame.draw.rect(close_surf, (*PURPLE, 150), (0, 0, 200, 50), 0, border_radius=10)
             pygame.draw.rect(close_surf, GOLD, (0, 0, 200, 50), 3, border_radius=10)
@@ -728,14 +1461,14 @@ class TarotGame:
             pygame.draw.rect(close_surf, (*PURPLE, 100), (0, 0, 200, 50), 0, border_radius=10)
             pygame.draw.rect(close_surf, GOLD, (0, 0, 200, 50), 2, border_radius=10)
         
-        close_text = small_font.render("Close", True, WHITE)
+        close_text = render_text(small_font, "Close", WHITE)
         close_surf.blit(close_text, (100 - close_text.get_width()//2, 
                                 25 - close_text.get_height()//2))
         
         screen.blit(close_surf, (close_button_x, close_button_y))
         
         # Return True if close button is hovered and clicked
-        return hover and pygame.mouse.get_pressed()[0]
+        return hover and self.mouse_pressed
 
 
 
@@ -744,44 +1477,70 @@ class TarotGame:
 
 
 
+    def interpretation_blocks(self):
+        """The parsed sections, then the final reflection, as ScrollPanel blocks"""
+        interpretation = self.ai_interpretation
+        sections = list(interpretation.sections)
+        if interpretation.reflection:
+            sections.append(interpretation.reflection)
+        
+        blocks = []
+        for section in sections:
+            # Heading on its own line, then the interpretation text, then a half-line gap
+            if section.heading:
+                blocks.append((section.heading, 0))
+            if section.text:
+                blocks.append((section.text, 0))
+            if blocks:
+                blocks[-1] = (blocks[-1][0], 15)
+        return blocks
+
+
+
+
     def draw_meaning_box(self, screen):
         if not self.current_cards:
             return
             
         # Calculate dimensions and position for bottom placement
-        box_width = min(2000, WIDTH - 40)  # Max width with some margin
-        box_height = min(1000, HEIGHT - 100)  # Increased height to accommodate multiple cards
-        box_x = (WIDTH - box_width) // 2
-        box_y = HEIGHT - box_height - 100  # Position at bottom with 30px margin
-        
-        # Create ornate background
-        box_surf = pygame.Surface((box_width, box_height), pygame.SRCALPHA)
-        
-        # Main parchment background
-        box_surf.fill((240, 230, 210, 240))
-        
-        # Add decorative border
-        pygame.draw.rect(box_surf, DARK_GOLD, (0, 0, box_width, box_height), 5, border_radius=15)
-        
-        # Add corner decorations
-        corner_size = 30
-        for x, y in [(0, 0), (box_width, 0), (0, box_height), (box_width, box_height)]:
-            if x == 0 and y == 0:  # Top-left
-                points = [(5, 5), (corner_size, 5), (5, corner_size)]
-            elif x == box_width and y == 0:  # Top-right
-                points = [(box_width-5, 5), (box_width-corner_size, 5), (box_width-5, corner_size)]
-            elif x == 0 and y == box_height:  # Bottom-left
-                points = [(5, box_height-5), (corner_size, box_height-5), (5, box_height-corner_size)]
-            else:  # Bottom-right
-                points = [(box_width-5, box_height-5), (box_width-corner_size, box_height-5), 
-                        (box_width-5, box_height-corner_size)]
-            pygame.draw.polygon(box_surf, DARK_GOLD, points)
+        box_width = min(2000, self.width - 40)  # Max width with some margin
+        box_height = min(1000, self.height - 100)  # Increased height to accommodate multiple cards
+        box_x = (self.width - box_width) // 2
+        box_y = self.height - box_height - 100  # Position at bottom with 30px margin
+        
+        # Build the parchment once per box size
+        if self.meaning_box_surf is None or self.meaning_box_surf.get_size() != (box_width, box_height):
+            # Create ornate background
+            box_surf = pygame.Surface((box_width, box_height), pygame.SRCALPHA)
+            
+            # Main parchment background
+            box_surf.fill((240, 230, 210, 240))
+            
+            # Add decorative border
+            pygame.draw.rect(box_surf, DARK_GOLD, (0, 0, box_width, box_height), 5, border_radius=15)
+            
+            # Add corner decorations
+            corner_size = 30
+            for x, y in [(0, 0), (box_width, 0), (0, box_height), (box_width, box_height)]:
+                if x == 0 and y == 0:  # Top-left
+                    points = [(5, 5), (corner_size, 5), (5, corner_size)]
+                elif x == box_width and y == 0:  # Top-right
+                    points = [(box_width-5, 5), (box_width-corner_size, 5), (box_width-5, corner_size)]
+                elif x == 0 and y == box_height:  # Bottom-left
+                    points = [(5, box_height-5), (corner_size, box_height-5), (5, box_height-corner_size)]
+                else:  # Bottom-right
+                    points = [(box_width-5, box_height-5), (box_width-corner_size, box_height-5), 
+                            (box_width-5, box_height-corner_size)]
+                pygame.draw.polygon(box_surf, DARK_GOLD, points)
+            
+            self.meaning_box_surf = box_surf
+            surface_stats.hold((id(self), "meaning box"), "panel backgrounds", box_surf)
         
         # Draw the surface to screen
-        screen.blit(box_surf, (box_x, box_y))
+        screen.blit(self.meaning_box_surf, (box_x, box_y))
         
         # Draw spread title
-        spread_title = title_font.render(f"{self.get_spread_name(self.current_spread)} Reading", True, DARK_PURPLE)
+        spread_title = render_text(title_font, f"{self.get_spread_name(self.current_spread)} Reading", DARK_PURPLE)
         screen.blit(spread_title, (box_x + box_width//2 - spread_title.get_width()//2, box_y + 20))
         
         # Calculate layout based on number of cards
@@ -834,16 +1593,15 @@ class TarotGame:
                 y_offset += 120
         
         # Draw close button at bottom of the box
-        close_button_y = box_y + box_height - 70
-        close_button_x = box_x + box_width//2 - 100
+        close_button_x, close_button_y = self.meaning_close_rect().topleft
         
         # Check hover state
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = self.mouse_pos
         hover = (close_button_x <= mouse_pos[0] <= close_button_x + 200 and 
                 close_button_y <= mouse_pos[1] <= close_button_y + 60)
         
         # Draw button with hover effect
-        close_surf = pygame.Surface((200, 60), pygame.SRCALPHA)
+        close_surf = surface_stats.new_surface((200, 60), pygame.SRCALPHA, "buttons")
         
         if hover:
             # Hover state - glowing
@@ -861,14 +1619,21 @@ class TarotGame:
             pygame.draw.rect(close_surf, GOLD, (0, 0, 200, 60), 3, border_radius=10)
         
         # Draw button text (without shadow)
-        close_text = font.render("Close Reading", True, WHITE)
+        close_text = render_text(font, "Close Reading", WHITE)
         close_surf.blit(close_text, (100 - close_text.get_width()//2, 
                                 30 - close_text.get_height()//2))
         
         screen.blit(close_surf, (close_button_x, close_button_y))
-        
-        # Return True if close button is hovered and clicked
-        return hover and pygame.mouse.get_pressed()[0]
+
+
+
+    def meaning_close_rect(self):
+        """Where draw_meaning_box puts its Close Reading button"""
+        box_width = min(2000, self.width - 40)
+        box_height = min(1000, self.height - 100)
+        box_x = (self.width - box_width) // 2
+        box_y = self.height - box_height - 100
+        return pygame.Rect(box_x + box_width//2 - 100, box_y + box_height - 70, 200, 60)
 
 
 
@@ -879,38 +1644,26 @@ class TarotGame:
         current_y = y
         
         if include_name:
-            name_text = small_font.render(card.name, True, DARK_PURPLE)
+            name_text = render_text(small_font, card.name, DARK_PURPLE)
             screen.blit(name_text, (x + width//2 - name_text.get_width()//2, current_y))
             current_y += 30
             
             if card.reversed:
-                rev_text = small_font.render("(Reversed)", True, (200, 50, 50))
+                rev_text = render_text(small_font, "(Reversed)", (200, 50, 50))
                 screen.blit(rev_text, (x + width//2 - rev_text.get_width()//2, current_y))
                 current_y += 30
         
-        # Get the meaning
-        meaning = card.reversed_meaning if card.reversed else card.upright
-        
-        # Render wrapped text
-        words = meaning.split()
-        lines = []
-        current_line = ""
-        for word in words:
-            test_line = current_line + word + " "
-            if meaning_font.size(test_line)[0] < width - 20:  # Account for margins
-                current_line = test_line
-            else:
-                lines.append(current_line)
-                current_line = word + " "
-        lines.append(current_line)
+        # Meaning text is wrapped and rendered once per card and column width
+        key = (card.name, card.reversed, width)
+        panel = self.text_panels.get(key)
+        if panel is None:
+            meaning = card.reversed_meaning if card.reversed else card.upright
+            panel = self.text_panels.put(key, ScrollPanel([(meaning, 0)], meaning_font, DARK_PURPLE,
+                                                          width - 10, line_height=35))
         
-        # Draw wrapped text lines
-        for i, line in enumerate(lines):
-            if current_y + i*35 > y + height:  # Don't overflow the allocated space
-                break
-            
-            text = meaning_font.render(line, True, DARK_PURPLE)
-            screen.blit(text, (x + 10, current_y + i*35))
+        text_rect = pygame.Rect(x + 10, current_y, width - 10, y + height - current_y)
+        panel.draw(screen, text_rect)
+        self.scroll_targets.append((text_rect, panel))
 
 
 
@@ -926,24 +1679,22 @@ class TarotGame:
             return
         
         # Check if clicked on a card
-        if self.current_cards:
-            positions = self.spread_positions[self.current_spread]
-            for i, card_pos in enumerate(positions):
-                px, py = card_pos
-                if (px - CARD_WIDTH//2 < x < px + CARD_WIDTH//2 and 
-                    py - CARD_HEIGHT//2 < y < py + CARD_HEIGHT//2):
-                    self.selected_card = self.current_cards[i]
-                    self.showing_meaning = True
-                    return
+        index = self.card_at(pos)
+        if index is not None:
+            self.selected_card = self.current_cards[index]
+            self.showing_meaning = True
+            return
         
         # Check if clicked on the close button in meaning box
         if self.showing_meaning and self.selected_card:
-            if self.draw_meaning_box(screen):
+            close_rect = self.meaning_close_rect()
+            if (close_rect.left <= x <= close_rect.right and 
+                close_rect.top <= y <= close_rect.bottom):
                 self.showing_meaning = False
                 return
         
         # Check buttons - must match EXACTLY how they're drawn in draw()
-        button_y = HEIGHT - 120
+        button_y = self.height - 120
         button_width = 200
         button_height = 70
         button_spacing = 220
@@ -960,7 +1711,7 @@ class TarotGame:
         
         # Calculate total width of all buttons with spacing
         total_width = (len(buttons)-1) * button_spacing + button_width
-        start_x = WIDTH//2 - total_width//2
+        start_x = self.width//2 - total_width//2
         
         for i, (text, pos, action) in enumerate(buttons):
             button_x = start_x + i * button_spacing
@@ -974,6 +1725,47 @@ class TarotGame:
 
 
 
+    def card_at(self, pos):
+        """Index of the dealt card under pos, or None"""
+        if not self.current_cards:
+            return None
+        x, y = pos
+        positions = self.spread_positions[self.current_spread]
+        for i, card_pos in enumerate(positions):
+            px, py = card_pos
+            if (px - CARD_WIDTH//2 < x < px + CARD_WIDTH//2 and 
+                py - CARD_HEIGHT//2 < y < py + CARD_HEIGHT//2):
+                return i
+        return None
+
+
+
+    def handle_right_click(self, pos):
+        """Right-clicking a card redraws just that position"""
+        if self.showing_ai_response:
+            return
+        index = self.card_at(pos)
+        if index is not None:
+            self.redraw_position(index)
+
+
+
+
+
+
+    def handle_scroll(self, pos, amount):
+        """Scroll whichever text panel is under the mouse by amount wheel notches"""
+        for rect, panel in reversed(self.scroll_targets):
+            if rect.collidepoint(pos):
+                panel.scroll(-amount * panel.line_height * 3)
+                return True
+        return False
+
+
+
+
+
+
     def save_reading_to_json(self):
         """Save the current reading to a JSON file"""
         if not self.current_cards:
@@ -988,13 +1780,20 @@ class TarotGame:
             # Generate a timestamped filename
             filename = f"readings/tarot_reading.json"
             
-            # Get the current reading data
+            # Get the current reading data, with the interpretation if there is one
             self.reading_data = self.get_reading_data()
+            self.reading_data["deck_seed"] = self.deck.seed  # Deck.regenerate(deck_seed) deals it again
+            if self.ai_interpretation:
+                self.reading_data["interpretation"] = self.ai_interpretation.to_dict()
             
             # Save to file
             with open(filename, 'w') as f:
                 json.dump(self.reading_data, f, indent=2)
             
+            # Keep every saved reading in the history too, where Similar Readings (S) can find it
+            self.saved_docs.append(get_reading_index().append(self.reading_data))
+            self.similar_readings = None
+            
             self.message = f"Reading saved as {filename}"
             return True
         except Exception as e:
@@ -1011,51 +1810,158 @@ class TarotGame:
         if not self.current_cards:
             return None
             
-        reading = {
-            "spread_type": self.get_spread_name(self.current_spread),
-            "cards": []
-        }
-        
-        positions = self.spread_names[self.current_spread]
-        
-        for i, card in enumerate(self.current_cards):
-            card_data = {
-                "position": positions[i],
-                "card_name": card.name,
-                "reversed": card.reversed,
-                "meaning": card.reversed_meaning if card.reversed else card.upright
-            }
-            reading["cards"].append(card_data)
-        
-        return reading
+        return build_reading_data(self.current_spread,
+                                  [(card.name, card.reversed) for card in self.current_cards])
+
+
 
 
 
 
+def handle_event(game, event):
+    """Apply one input event to the game; returns False when the player quits"""
+    if event.type == QUIT:
+        return False
+    elif event.type == KEYDOWN:
+        if event.key == K_ESCAPE:
+            return False
+        elif event.key == K_b:
+            game.cycle_interpreter()
+        elif event.key == K_p:
+            game.toggle_prefetch()
+        elif event.key == K_F3:
+            game.toggle_surface_stats()
+        elif event.key == K_g:
+            game.toggle_effects()
+        elif event.key == K_s:
+            game.toggle_similar_readings()
+    elif event.type == MOUSEBUTTONDOWN:
+        if event.button == 1:
+            game.handle_click(to_render_pos(event.pos))
+        elif event.button == 3:
+            game.handle_right_click(to_render_pos(event.pos))
+    elif event.type == MOUSEWHEEL:
+        game.handle_scroll(game.mouse_pos, event.y)
+    return True
+
+
+
+class Kiosk:
+    """Independent tables sharing one window, each a TarotGame drawn into its own viewport.
+    
+    Every table has its own deck, spread and AI state, while card faces, text,
+    backgrounds and layouts are shared. Keys go to the table clicked last.
+    """
+    
+    OFF_TABLE = (-1, -1)  # Mouse position given to the tables the mouse is not over
+    
+    def __init__(self, screen, columns=1, rows=1):
+        width, height = screen.get_width() // columns, screen.get_height() // rows
+        self.tables = []  # (viewport rect, surface to draw on, game)
+        for row in range(rows):
+            for column in range(columns):
+                rect = pygame.Rect(column * width, row * height, width, height)
+                surface = screen if rect.size == screen.get_size() else screen.subsurface(rect)
+                self.tables.append((rect, surface, TarotGame(width=width, height=height)))
+        self.games = [game for _, _, game in self.tables]
+        self.focus = self.games[0]
+    
+    def table_at(self, pos):
+        for rect, surface, game in self.tables:
+            if rect.collidepoint(pos):
+                return rect, game
+        return None, None
+    
+    def update_mouse(self, pos, pressed):
+        """Give each table this frame's mouse state in its own coordinates"""
+        for rect, surface, game in self.tables:
+            if rect.collidepoint(pos):
+                game.mouse_pos = (pos[0] - rect.x, pos[1] - rect.y)
+                game.mouse_pressed = pressed
+            else:
+                game.mouse_pos = self.OFF_TABLE
+                game.mouse_pressed = False
+    
+    def handle_event(self, event):
+        """Route one input event to its table; returns False when the player quits"""
+        if event.type == MOUSEBUTTONDOWN:
+            pos = to_render_pos(event.pos)
+            rect, game = self.table_at(pos)
+            if game is not None:
+                self.focus = game
+                if event.button == 1:
+                    game.handle_click((pos[0] - rect.x, pos[1] - rect.y))
+                elif event.button == 3:
+                    game.handle_right_click((pos[0] - rect.x, pos[1] - rect.y))
+            return True
+        if event.type == MOUSEWHEEL:
+            for game in self.games:
+                if game.mouse_pos != self.OFF_TABLE:
+                    return handle_event(game, event)
+            return True
+        return handle_event(self.focus, event)
+    
+    def draw(self, screen):
+        for rect, surface, game in self.tables:
+            game.draw(surface)
+        if len(self.tables) > 1:
+            for rect, surface, game in self.tables:
+                pygame.draw.rect(screen, GOLD if game is self.focus else DARK_GOLD, rect, 3 if game is self.focus else 1)
+
 
 
 def main():
     clock = pygame.time.Clock()
-    game = TarotGame()
-    game.reset_deck()
+    
+    kiosk = Kiosk(screen, TABLE_COLUMNS, TABLE_ROWS)
+    
+    # TAROT_RECORD_SESSION=<file> records input, the seed and AI answers for tarot_replay.py
+    recorder = None
+    if os.getenv("TAROT_RECORD_SESSION"):
+        if len(kiosk.games) > 1:
+            print("TAROT_RECORD_SESSION records a single table, so it is ignored with TAROT_TABLES.")
+        else:
+            from tarot_replay import SessionRecorder
+            recorder = SessionRecorder(os.getenv("TAROT_RECORD_SESSION"))
+    
+    for game in kiosk.games:
+        game.recorder = recorder
+        if recorder:
+            recorder.start(game, (DISPLAY_WIDTH, DISPLAY_HEIGHT), quality, effects)
+        game.reset_deck()
+    
+    # Edits to card_meanings.json and card_images/ show up without a restart (TAROT_HOT_RELOAD=0 turns this off)
+    asset_watcher = AssetWatcher() if os.getenv("TAROT_HOT_RELOAD", "1") != "0" else None
     
     running = True
     while running:
+        kiosk.update_mouse(to_render_pos(pygame.mouse.get_pos()), pygame.mouse.get_pressed()[0])
+        if recorder:
+            recorder.next_frame(kiosk.focus.mouse_pos, kiosk.focus.mouse_pressed)
+        
         for event in pygame.event.get():
-            if event.type == QUIT:
+            if recorder:
+                recorder.record_event(event)
+            if not kiosk.handle_event(event):
                 running = False
-            elif event.type == KEYDOWN:
-                if event.key == K_ESCAPE:
-                    running = False
-            elif event.type == MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    game.handle_click(event.pos)
         
-        game.draw(screen)
+        if asset_watcher:
+            asset_watcher.poll(kiosk.games)
+        
+        kiosk.draw(screen)
+        surface_stats.end_frame()
         
-        pygame.display.flip()
+        present()
         clock.tick(30)
     
+    if recorder:
+        recorder.close()
+    if reading_index is not None:
+        reading_index.save()
+    card_face_loader.shutdown()
+    ai_scheduler.shutdown()
+    if os.getenv("TAROT_SURFACE_REPORT") == "1":
+        print(surface_stats.report())
     pygame.quit()
     sys.exit()
 
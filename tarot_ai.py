@@ -0,0 +1,555 @@
+"""Interpretation backends and the scheduling of AI requests.
+
+Every API interpretation goes through an AIScheduler, which keeps callers inside
+the API quota instead of letting them fail against it:
+
+- a token bucket limits the request rate, and a thread pool caps how many
+  requests are in flight at once
+- rate-limit, timeout and server errors are retried with exponential backoff
+  and full jitter, honouring any Retry-After the API sends
+- identical requests made while one is already running share its result
+- every call is timed and counted in tarot_telemetry
+
+Backends (OpenAI, a local OpenAI-compatible server, or the offline composer)
+are picked with get_interpreter, optionally as a fallback chain.
+"""
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+from tarot_core import AI_MODEL, AI_SYSTEM_PROMPT, build_ai_prompt
+from tarot_telemetry import call_context, new_record, note_call, telemetry as default_telemetry
+
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError"}
+REVISION_MAX_TOKENS = 400  # Enough for one or two redrawn positions and the final reflection
+
+
+
+def reading_key(reading_data):
+    """Stable identity for a reading, so duplicate interpretation requests can be shared"""
+    cards = [(card["position"], card["card_name"], card["reversed"]) for card in reading_data["cards"]]
+    key = [reading_data["spread_type"], cards]
+    if reading_data.get("revise"):
+        key.append(reading_data["revise"])  # A revision only answers for some positions
+    return json.dumps(key)
+
+
+def is_retryable(error):
+    """True for errors that may succeed if repeated: rate limits, timeouts, dropped connections and 5xx"""
+    # An exhausted quota is also reported as a 429, but waiting won't fix it
+    if getattr(error, "code", None) == "insufficient_quota":
+        return False
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in RETRYABLE_ERRORS or isinstance(error, (ConnectionError, TimeoutError))
+
+
+def get_retry_after(error):
+    """Seconds the API asked us to wait before retrying, or None"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller back, e.g. after the API sends Retry-After; the quota is shared"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+
+class AIScheduler:
+    def __init__(self, requests_per_minute=60, max_concurrent=4, max_retries=5,
+                 base_delay=1.0, max_delay=60.0, telemetry=None):
+        self.bucket = TokenBucket(requests_per_minute / 60.0, max(1, min(max_concurrent, requests_per_minute)))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="tarot-ai")
+        self.in_flight = {}
+        self.waiters = {}  # key -> number of callers still interested in the in-flight request
+        self.lock = threading.Lock()
+        self.telemetry = telemetry or default_telemetry
+
+    @classmethod
+    def from_env(cls):
+        """Scheduler configured from TAROT_AI_RPM and TAROT_AI_CONCURRENCY"""
+        return cls(requests_per_minute=float(os.getenv("TAROT_AI_RPM", 60)),
+                   max_concurrent=int(os.getenv("TAROT_AI_CONCURRENCY", 4)))
+
+
+
+    def submit(self, key, fn, *args, backend="api"):
+        """Run fn(*args) under the rate limit and return a Future for its result.
+
+        While a request with the same key is still running, its Future is
+        returned instead of starting another one. Every submit should be
+        matched by a release() if the caller loses interest before it finishes.
+        `backend` labels the call in telemetry.
+        """
+        submitted = time.monotonic()
+        with self.lock:
+            self.waiters[key] = self.waiters.get(key, 0) + 1
+            future = self.in_flight.get(key)
+            if future is not None and not future.done():
+                self.record_shared(future, backend, submitted)
+                return future
+            future = Future()
+            future.record = new_record(backend)
+            self.in_flight[key] = future
+
+        self.executor.submit(self.run, key, future, fn, args, submitted)
+        return future
+
+    def record_shared(self, future, backend, submitted):
+        """Count a caller served by a request already in flight as a cache hit"""
+        def done(future):
+            record = new_record(backend, cache="hit")
+            record["model"] = future.record["model"]
+            record["latency_s"] = time.monotonic() - submitted
+            error = CancelledError() if future.cancelled() else future.exception()
+            record["error"] = None if error is None else type(error).__name__
+            self.telemetry.record(record)
+        future.add_done_callback(done)
+
+    def release(self, key):
+        """Drop one caller's interest in a request; once nobody is waiting, it is
+        cancelled if it hasn't been sent yet and not retried if it fails"""
+        with self.lock:
+            remaining = self.waiters.get(key, 0) - 1
+            if remaining > 0:
+                self.waiters[key] = remaining
+                return
+            self.waiters.pop(key, None)
+            future = self.in_flight.get(key)
+        if future is not None:
+            future.cancel()  # Only succeeds while still queued or waiting for the rate limit
+
+    def run(self, key, future, fn, args, submitted):
+        record = future.record
+        try:
+            attempt = 0
+            while True:
+                if future.cancelled():
+                    return
+                self.bucket.acquire()
+                if attempt == 0:
+                    if not future.set_running_or_notify_cancel():
+                        return
+                    record["queue_s"] = time.monotonic() - submitted
+                elif key not in self.waiters:
+                    future.set_exception(CancelledError())
+                    return
+                record["attempts"] += 1
+                call_context.record = record  # Lets the backend add its model, tokens and TTFT
+                try:
+                    result = fn(*args)
+                except Exception as e:
+                    delay = self.backoff(attempt, e) if attempt < self.max_retries and is_retryable(e) else None
+                    if delay is None:
+                        future.set_exception(e)
+                        return
+                    time.sleep(delay)
+                    attempt += 1
+                else:
+                    future.set_result(result)
+                    return
+                finally:
+                    call_context.record = None
+        finally:
+            with self.lock:
+                if self.in_flight.get(key) is future:
+                    del self.in_flight[key]
+                    self.waiters.pop(key, None)
+            # Requests cancelled before they were sent cost nothing and aren't counted
+            if record["attempts"]:
+                record["latency_s"] = time.monotonic() - submitted
+                error = future.exception() if future.done() and not future.cancelled() else None
+                record["error"] = None if error is None else type(error).__name__
+                self.telemetry.record(record)
+
+    def backoff(self, attempt, error):
+        """Delay before the next attempt: Retry-After when given, else exponential with full jitter.
+
+        None when Retry-After asks for longer than max_delay (a daily quota, say):
+        the request fails rather than holding a worker and the shared bucket that long.
+        """
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            self.bucket.pause(min(retry_after, self.max_delay))
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+
+
+# --- Interpretation backends ------------------------------------------------
+
+class Interpreter:
+    """Turns reading data into interpretation text in the format parse_ai_response expects"""
+
+    name = "interpreter"
+    rate_limited = True  # Whether calls must go through an AIScheduler
+
+    def interpret(self, reading_data):
+        raise NotImplementedError
+
+
+
+class OpenAIInterpreter(Interpreter):
+    """Chat-completions backend for OpenAI or any endpoint that speaks the same API"""
+
+    name = "openai"
+
+    def __init__(self, model=AI_MODEL, api_key=None, base_url=None):
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.client = None
+
+    def get_client(self):
+        # Built on first use and then reused, so connections are pooled across readings
+        if self.client is None:
+            from openai import OpenAI
+            # Retries are left to the AIScheduler so backoff isn't applied twice
+            self.client = OpenAI(api_key=self.api_key or os.getenv("OPENAI_API_KEY"),
+                                 base_url=self.base_url, max_retries=0)
+        return self.client
+
+    def interpret(self, reading_data):
+        # Streamed, so telemetry can see the time to the first token
+        started = time.monotonic()
+        stream = self.get_client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": AI_SYSTEM_PROMPT},
+                {"role": "user", "content": build_ai_prompt(reading_data)}
+            ],
+            temperature=0.7,
+            max_tokens=REVISION_MAX_TOKENS if reading_data.get("revise") else 1000,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+
+        parts = []
+        first_token = None
+        model = self.model
+        usage = None
+        for chunk in stream:
+            model = chunk.model or model
+            if chunk.usage:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token is None:
+                    first_token = time.monotonic()
+                parts.append(chunk.choices[0].delta.content)
+
+        note_call(model=model,
+                  ttft_s=None if first_token is None else first_token - started,
+                  prompt_tokens=usage.prompt_tokens if usage else None,
+                  completion_tokens=usage.completion_tokens if usage else None)
+        return "".join(parts)
+
+
+
+class LocalInterpreter(OpenAIInterpreter):
+    """A local OpenAI-compatible server (Ollama, llama.cpp, LM Studio, vLLM...)"""
+
+    name = "local"
+
+    def __init__(self, model=None, base_url=None):
+        super().__init__(
+            model=model or os.getenv("TAROT_LOCAL_AI_MODEL", "llama3"),
+            api_key=os.getenv("TAROT_LOCAL_AI_KEY", "local"),
+            base_url=base_url or os.getenv("TAROT_LOCAL_AI_URL", "http://localhost:11434/v1"),
+        )
+
+
+
+POSITION_EMOJI = {
+    "Current Situation": "🌟", "Past": "⏳", "Present": "🌟", "Future": "🌑",
+    "1 - Present": "🌟", "2 - Challenge": "⚔️", "3 - Past": "⏳", "4 - Future": "🌑",
+    "5 - Above": "☁️", "6 - Below": "🧑‍🤝‍🧑", "7 - Advice": "🌀", "8 - External": "💨",
+    "9 - Hopes/Fears": "💖", "10 - Outcome": "🌱",
+}
+
+POSITION_FRAMES = {
+    "Current Situation": "This is the energy surrounding you right now.",
+    "Past": "This is what has shaped the path that brought you here.",
+    "Present": "This is the energy you are living in at this moment.",
+    "Future": "This is where the current path is leading if nothing changes.",
+    "1 - Present": "This is the heart of the matter as it stands today.",
+    "2 - Challenge": "This is the force that crosses you and must be worked through.",
+    "3 - Past": "This is the foundation laid by what came before.",
+    "4 - Future": "This is what is approaching in the near future.",
+    "5 - Above": "This is your conscious aim, what you are reaching for.",
+    "6 - Below": "This is the hidden influence working beneath the surface.",
+    "7 - Advice": "This is the approach the cards counsel you to take.",
+    "8 - External": "This is how the people and events around you bear on the question.",
+    "9 - Hopes/Fears": "This is what you hope for and fear in equal measure.",
+    "10 - Outcome": "This is where all of these threads are leading.",
+}
+
+SUIT_THEMES = {
+    "Wands": "passion, drive and creative fire",
+    "Cups": "emotions, relationships and intuition",
+    "Swords": "thought, conflict and hard truths",
+    "Pentacles": "work, money and the material world",
+}
+
+
+class OfflineInterpreter(Interpreter):
+    """Deterministic interpretation composed from card_meanings.json, the spread positions
+    and patterns across the cards. Needs no network and answers instantly."""
+
+    name = "offline"
+    rate_limited = False
+
+    def interpret(self, reading_data):
+        cards = reading_data["cards"]
+        suits = [card["card_name"].rsplit(" ", 1)[-1] for card in cards if " of " in card["card_name"]]
+        majors = [card for card in cards if " of " not in card["card_name"]]
+        reversed_count = sum(1 for card in cards if card["reversed"])
+
+        ranks = {}
+        for card in cards:
+            if " of " in card["card_name"]:
+                ranks.setdefault(card["card_name"].split(" of ")[0], []).append(card["card_name"])
+
+        revise = reading_data.get("revise")
+        parts = []
+        for i, card in enumerate(cards):
+            position = card["position"]
+            if revise and position not in revise:
+                continue
+            orientation = "Reversed" if card["reversed"] else "Upright"
+            lines = [
+                f"{POSITION_EMOJI.get(position, '✨')} {position}: {card['card_name']} ({orientation})",
+                f"{POSITION_FRAMES.get(position, '')} {card['meaning']}".strip(),
+            ]
+
+            # Tie the card to its neighbours in the spread
+            links = []
+            rank = card["card_name"].split(" of ")[0] if " of " in card["card_name"] else None
+            if rank and len(ranks.get(rank, [])) > 1:
+                others = [name for name in ranks[rank] if name != card["card_name"]]
+                links.append(f"It echoes the {' and '.join(others)}, doubling the message of this rank.")
+            if i > 0 and cards[i - 1]["reversed"] and card["reversed"]:
+                links.append(f"Like the {cards[i - 1]['card_name']} before it, it appears reversed, so this energy is blocked or turned inward.")
+            if links:
+                lines.append(" ".join(links))
+            parts.append("\n".join(lines))
+
+        reflection = []
+        if suits:
+            dominant = max(SUIT_THEMES, key=suits.count)
+            if suits.count(dominant) > 1:
+                reflection.append(f"{dominant} lead this spread, so the story turns on {SUIT_THEMES[dominant]}.")
+        if len(majors) * 2 > len(cards):
+            reflection.append("With the Major Arcana holding most positions, larger forces than daily choices are at work.")
+        elif majors:
+            names = [card["card_name"] for card in majors]
+            names = " and ".join([", ".join(names[:-1]), names[-1]] if len(names) > 2 else names)
+            verb = "mark" if len(majors) > 1 else "marks"
+            reflection.append(f"{names} {verb} where fate touches this reading most strongly.")
+        if reversed_count * 2 > len(cards):
+            reflection.append("So many reversals suggest energy that is stuck; look inward before pushing outward.")
+        elif reversed_count == 0:
+            reflection.append("Every card stands upright, so these energies are flowing openly.")
+        last = cards[-1]
+        reflection.append(f"Let the {last['card_name']} in {last['position']} guide your next step.")
+
+        parts.append("🔮 Final Reflection:\n" + " ".join(reflection))
+        return "\n\n".join(parts) + "\n"
+
+
+
+class FallbackInterpreter(Interpreter):
+    """Tries each backend in turn until one answers"""
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.name = ",".join(backend.name for backend in backends)
+        self.rate_limited = any(backend.rate_limited for backend in backends)
+
+    def interpret(self, reading_data):
+        error = None
+        for backend in self.backends:
+            try:
+                return backend.interpret(reading_data)
+            except Exception as e:
+                error = e
+        raise error
+
+
+
+INTERPRETERS = {
+    "openai": OpenAIInterpreter,
+    "local": LocalInterpreter,
+    "offline": OfflineInterpreter,
+}
+
+# Choices the game cycles through, most capable first
+INTERPRETER_CHOICES = ["openai,offline", "local,offline", "openai", "local", "offline"]
+
+
+def get_interpreter(spec=None):
+    """Build an interpreter from a name or a comma-separated fallback chain like "openai,offline".
+
+    Defaults to TAROT_INTERPRETER, or OpenAI with the offline composer as fallback.
+    """
+    spec = spec or os.getenv("TAROT_INTERPRETER", "openai,offline")
+    names = [name.strip().lower() for name in spec.split(",") if name.strip()]
+    unknown = [name for name in names if name not in INTERPRETERS]
+    if unknown or not names:
+        raise ValueError(f"Unknown interpreter {spec!r}. Choose from: {', '.join(INTERPRETERS)}")
+    backends = [INTERPRETERS[name]() for name in names]
+    return backends[0] if len(backends) == 1 else FallbackInterpreter(backends)
+
+
+class InterpretationRequest(Future):
+    """Future for one interpretation.
+
+    `backend` names the backend that answered and `errors` lists the failures
+    before it. cancel_request() abandons the request; an API call that hasn't
+    been sent yet is then never made.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.set_running_or_notify_cancel()
+        self.backend = None
+        self.errors = []
+        self.reading_data = None  # What was asked, including any positions being revised
+        self.pending = None  # (scheduler, key) of the API request being waited on
+        self.lock = threading.Lock()
+
+    def finish(self, text=None, error=None, backend=None):
+        with self.lock:
+            if self.done():
+                return  # Already abandoned
+            self.pending = None
+            if error is None:
+                self.backend = backend
+                self.set_result(text)
+            else:
+                self.set_exception(error)
+
+    def cancel_request(self):
+        with self.lock:
+            if self.done():
+                return False
+            pending, self.pending = self.pending, None
+            self.set_exception(CancelledError())
+        if pending is not None:
+            scheduler, key = pending
+            scheduler.release(key)
+        return True
+
+
+
+def request_interpretation(scheduler, interpreter, reading_data):
+    """Interpret a reading in the background and return an InterpretationRequest for the text.
+
+    Backends that call an API go through the scheduler (rate limit, retries,
+    sharing of duplicate requests); if one still fails, the next backend in a
+    fallback chain is tried.
+    """
+    backends = interpreter.backends if isinstance(interpreter, FallbackInterpreter) else [interpreter]
+    result = InterpretationRequest()
+    result.reading_data = reading_data
+
+    def attempt(index):
+        if result.done():
+            return
+        if index == len(backends):
+            result.finish(error=result.errors[-1])
+            return
+        backend = backends[index]
+
+        if not backend.rate_limited:
+            record = new_record(backend.name)
+            record.update(model=getattr(backend, "model", None), queue_s=0.0, attempts=1)
+            started = time.monotonic()
+            try:
+                text = backend.interpret(reading_data)
+            except Exception as e:
+                record.update(latency_s=time.monotonic() - started, error=type(e).__name__)
+                scheduler.telemetry.record(record)
+                result.errors.append(e)
+                attempt(index + 1)
+            else:
+                record["latency_s"] = time.monotonic() - started
+                scheduler.telemetry.record(record)
+                result.finish(text, backend=backend.name)
+            return
+
+        def done(future):
+            error = CancelledError() if future.cancelled() else future.exception()
+            if error is None:
+                result.finish(future.result(), backend=backend.name)
+            else:
+                result.errors.append(error)
+                attempt(index + 1)
+
+        key = (backend.name, reading_key(reading_data))
+        result.pending = (scheduler, key)
+        scheduler.submit(key, backend.interpret, reading_data, backend=backend.name).add_done_callback(done)
+
+    attempt(0)
+    return result
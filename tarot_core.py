@@ -0,0 +1,489 @@
+"""Deck, spread and prompt logic shared by the game window, the reading server and batch tools.
+
+Nothing in here imports pygame, so it can run in a headless process.
+"""
+import json
+import os
+import re
+import secrets
+import unicodedata
+
+import numpy as np
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Tarot Deck (Complete 78 cards)
+major_arcana = [
+    "0 The Fool", "I The Magician", "II The High Priestess", "III The Empress", 
+    "IV The Emperor", "V The Hierophant", "VI The Lovers", "VII The Chariot", 
+    "VIII Strength", "IX The Hermit", "X Wheel of Fortune", "XI Justice", 
+    "XII The Hanged Man", "XIII Death", "XIV Temperance", "XV The Devil", 
+    "XVI The Tower", "XVII The Star", "XVIII The Moon", "XIX The Sun", 
+    "XX Judgement", "XXI The World"
+]
+
+suits = ["Wands", "Cups", "Swords", "Pentacles"]
+ranks = ["Ace", "2", "3", "4", "5", "6", "7", "8", "9", "10", "Page", "Knight", "Queen", "King"]
+minor_arcana = [f"{rank} of {suit}" for suit in suits for rank in ranks]
+
+full_deck = major_arcana + minor_arcana
+
+CARD_MEANINGS_PATH = os.path.join(BASE_DIR, 'card_meanings.json')
+CARD_IMAGES_DIR = os.path.join(BASE_DIR, 'card_images')
+
+with open(CARD_MEANINGS_PATH, 'r') as f:
+    card_meanings = json.load(f)
+
+# Chance that a drawn card lands reversed
+REVERSED_CHANCE = 0.2
+
+# Spread types
+SPREAD_SINGLE = 1
+SPREAD_THREE = 2
+SPREAD_CELTIC = 3
+
+SPREAD_NAMES = {
+    SPREAD_SINGLE: ["Current Situation"],
+    SPREAD_THREE: ["Past", "Present", "Future"],
+    SPREAD_CELTIC: [
+        "1 - Present", "2 - Challenge", "3 - Past", "4 - Future",
+        "5 - Above", "6 - Below", "7 - Advice", "8 - External",
+        "9 - Hopes/Fears", "10 - Outcome"
+    ]
+}
+
+AI_MODEL = "gpt-3.5-turbo"
+AI_SYSTEM_PROMPT = "You are a wise, mystical tarot reader with deep intuitive powers. Provide insightful, poetic interpretations of tarot readings."
+
+
+
+def get_spread_name(spread_type):
+    if spread_type == SPREAD_SINGLE:
+        return "Single Card"
+    elif spread_type == SPREAD_THREE:
+        return "Past-Present-Future"
+    else:
+        return "Celtic Cross"
+
+
+def get_spread_type(spread_name):
+    """Inverse of get_spread_name, for readings loaded back from JSON"""
+    for spread_type in SPREAD_NAMES:
+        if get_spread_name(spread_type) == spread_name:
+            return spread_type
+    raise ValueError(f"Unknown spread type: {spread_name}")
+
+
+# --- Shuffling ---------------------------------------------------------------
+#
+# Every reading has its own seed: the session seed and the reading's number in
+# the session. Decks come from a counter-based generator keyed by the session
+# seed, with each reading taking a fixed stretch of its stream (a sort key and
+# a reversal draw per card), so any reading can be dealt again from its seed
+# alone, and consecutive readings can be dealt in one vectorized call.
+
+DECK_SIZE = len(full_deck)
+READINGS_PER_SESSION = 2**32
+# Philox gives four 64-bit draws per counter step, one draw per double
+BLOCKS_PER_READING = 2 * DECK_SIZE // 4
+
+
+def new_session_seed():
+    # 64 bits, so even a server's worth of sessions practically never share a seed (Philox keys take 128)
+    return secrets.randbits(64)
+
+
+def reading_seed(session_seed, number):
+    return session_seed * READINGS_PER_SESSION + number
+
+
+def deal_batch(session_seed, start, count):
+    """Deck orders and reversal flags for readings start .. start+count-1 of a session.
+
+    Returns (orders, reversed): orders[i] holds indices into full_deck with the
+    top card last, and reversed[i] is indexed by card, both one row per reading.
+    """
+    bit_generator = np.random.Philox(key=session_seed)
+    bit_generator.advance(start * BLOCKS_PER_READING)
+    draws = np.random.Generator(bit_generator).random((count, 2, DECK_SIZE))
+    return np.argsort(draws[:, 0], axis=1).astype(np.int16), draws[:, 1] < REVERSED_CHANCE
+
+
+
+class Deck:
+    """A shuffled deck for one reading; pop() takes the top card and the orientation drawn for it"""
+
+    def __init__(self, seed, order, reversed_flags):
+        self.seed = seed
+        self.order = order.tolist()
+        self.reversed = reversed_flags.tolist()
+
+    @classmethod
+    def regenerate(cls, seed):
+        """The deck of the reading with this seed, exactly as it was dealt"""
+        session_seed, number = divmod(seed, READINGS_PER_SESSION)
+        orders, reversed_flags = deal_batch(session_seed, number, 1)
+        return cls(seed, orders[0], reversed_flags[0])
+
+    def __len__(self):
+        return len(self.order)
+
+    def pop(self):
+        index = self.order.pop()
+        return full_deck[index], self.reversed[index]
+
+
+
+class DeckEngine:
+    """Deals the readings of one session, keeping the seed of each"""
+
+    def __init__(self, seed=None):
+        self.seed = seed if seed is not None else new_session_seed()
+        self.readings = 0  # Readings dealt so far, the number of the next one
+        self.seeds = []
+
+    def next_seeds(self, count):
+        seeds = [reading_seed(self.seed, self.readings + i) for i in range(count)]
+        self.readings += count
+        self.seeds += seeds
+        return seeds
+
+    def new_deck(self):
+        """A freshly shuffled deck for the next reading"""
+        return Deck.regenerate(self.next_seeds(1)[0])
+
+    def deal_batch(self, count):
+        """The next count readings at once, for batch jobs: (seeds, orders, reversed) as in deal_batch()"""
+        start = self.readings
+        return (self.next_seeds(count),) + deal_batch(self.seed, start, count)
+
+
+def reload_card_meanings():
+    """Re-read card_meanings.json, updating card_meanings in place so every importer sees the change.
+
+    Returns {card name: set of changed fields} for the cards whose entries differ.
+    """
+    with open(CARD_MEANINGS_PATH, 'r') as f:
+        meanings = json.load(f)
+    changed = {}
+    for name in card_meanings.keys() | meanings.keys():
+        old, new = card_meanings.get(name, {}), meanings.get(name, {})
+        fields = {field for field in old.keys() | new.keys() if old.get(field) != new.get(field)}
+        if fields:
+            changed[name] = fields
+    # One card at a time, so a face being built on another thread never sees the dict half-filled
+    for name in changed:
+        if name in meanings:
+            card_meanings[name] = meanings[name]
+        else:
+            del card_meanings[name]
+    return changed
+
+
+def get_meaning(name, reversed):
+    """Look up the upright or reversed meaning of a card"""
+    meanings = card_meanings.get(name, {})
+    if reversed:
+        return meanings.get('reversed', "No reversed meaning available.")
+    return meanings.get('upright', "No meaning available.")
+
+
+def build_reading_data(spread_type, cards):
+    """Build the reading dict for a spread from (card_name, reversed) pairs in position order"""
+    reading = {
+        "spread_type": get_spread_name(spread_type),
+        "cards": []
+    }
+    
+    positions = SPREAD_NAMES[spread_type]
+    
+    for i, (name, reversed) in enumerate(cards):
+        card_data = {
+            "position": positions[i],
+            "card_name": name,
+            "reversed": reversed,
+            "meaning": get_meaning(name, reversed)
+        }
+        reading["cards"].append(card_data)
+    
+    return reading
+
+
+def build_ai_prompt(reading_data):
+    """Format a reading as the interpretation prompt sent to the AI"""
+    if reading_data.get("revise"):
+        return build_revision_prompt(reading_data)
+    
+    prompt = (
+        f"Act as a mystical tarot card reader. Interpret this {reading_data['spread_type']} spread:\n\n"
+    )
+    
+    for card in reading_data['cards']:
+        prompt += (
+            f"Position: {card['position']}\n"
+            f"Card: {card['card_name']} ({'Reversed' if card['reversed'] else 'Upright'})\n"
+            f"Meaning: {card['meaning']}\n\n"
+        )
+    
+    prompt += (
+        "\n\n"
+        "||| STRICT FORMATTING COMMANDS |||\n\n"
+        "1. **MANDATORY SPACING FORMAT**:\n"
+        "[NEWLINE][NEWLINE]\n"
+        "[EMOJI] [Position#] - [Position Name]: [Card Name] (Upright/Reversed)[NEWLINE]\n"
+        "[Interpretation paragraph 1][NEWLINE]\n"
+        "[Interpretation paragraph 2][NEWLINE]\n"
+        "[NEWLINE]\n\n"
+        "2. **INTERPRETATION STRUCTURE**:\n"
+        "- First line: Core meaning (complete sentence)\n"
+        "- Second line: Practical implications\n"
+        "- Third line: Intuitive message\n"
+        "- Fourth line: Connection to other cards\n\n"
+        "3. **FINAL REFLECTION FORMAT**:\n"
+        "[NEWLINE][NEWLINE]\n"
+        "🔮 Final Reflection:[NEWLINE]\n"
+        "[Paragraph 1][NEWLINE]\n"
+        "[Paragraph 2][NEWLINE]\n"
+        "[Closing statement][NEWLINE]\n"
+        "[NEWLINE]\n\n"
+        
+        "and return the output in bullet points as below:\n\n"
+        "=== EXAMPLE OF REQUIRED OUTPUT ===\n\n"
+        "🌟 1 - Present: 4 of Wands (Reversed)\n"
+        "You're in a phase where what should feel stable or celebratory—like home, relationships, or creative achievements—feels instead disrupted. This card reversed speaks of conflict within a familiar structure, perhaps tension in a home, team, or partnership. You may be transitioning away from what once brought you comfort, or feeling unsupported as you try to move forward.\n\n"
+        "⚔️ 2 - Challenge: 2 of Cups (Reversed)\n"
+        "Your biggest challenge right now is a breakdown in communication or emotional connection with someone important. A partnership or relationship is out of balance—maybe romantic, maybe a close friend or ally. Mistrust or misunderstandings may be at play, and healing this rift could be central to your current struggle.\n\n"
+        "⏳ 3 - Past: 6 of Cups (Reversed)\n"
+        "You've recently been forced to let go of the past—perhaps a memory, old pattern, or nostalgia was holding you back. Whether it was comforting or painful, you’re now in the process of moving forward. This is a sign of emotional growth, though not without discomfort.\n\n"
+        "🌑 4 - Future: The Moon (Upright)\n"
+        "What’s coming next may feel uncertain or disorienting. The Moon brings confusion, illusions, and hidden truths—things are not what they appear. You will need to rely on intuition, dreams, and your inner compass to navigate what lies ahead. Don't act on fear or illusion—seek clarity in the fog.\n\n"
+        "☁️ 5 - Above (Conscious Goal): 6 of Wands (Reversed)\n"
+        "You're struggling with recognition and validation. You might feel that your efforts go unnoticed, or you fear failure and public judgment. This card can also point to ego wounds—perhaps you want to win or be seen, but fear losing face. It’s a reminder that true success comes from within, not applause.\n\n"
+        "🧑‍🤝‍🧑 6 - Below (Unconscious Influence): 3 of Cups (Upright)\n"
+        "At a deeper level, you crave connection, joy, and genuine friendship. There's a strong desire to belong and be celebrated with others—even if recent events have made you feel isolated. This unconscious influence may be guiding you to seek a new sense of community or re-establish joyful bonds.\n\n"
+        "🌀 7 - Advice: The World (Reversed)\n"
+        "You're being asked to complete what you’ve left unfinished. There’s a cycle in your life—emotional, spiritual, or literal—that hasn’t come to full closure. Fear of change, fear of endings, or feeling like something’s missing is blocking your progress. It’s time to gather your strength and see the journey through.\n\n"
+        "💨 8 - External Influences: Knight of Swords (Upright)\n"
+        "Your environment is fast-moving and intense, with people or events pushing you toward rapid decisions. Someone around you may be aggressive in their opinions or rushing things. Be wary of impulsive actions—both your own and others'. Stay grounded as you navigate this external pressure.\n\n"
+        "💖 9 - Hopes/Fears: 10 of Cups (Upright)\n"
+        "At your core, you long for peace, harmony, and emotional fulfillment, particularly within your home or family life. This card speaks to the dream of deep connection, support, and love. But since this is also in your fears, perhaps you’re afraid it may never come—or that you’ll sabotage it. It’s a beautiful vision, but you may fear it's just out of reach.\n\n"
+        "🌱 10 - Outcome: 7 of Pentacles (Upright)\n"
+        "Your outcome suggests growth, but not overnight. This is a card of patient progress—planting seeds and watching them slowly bear fruit. Your effort will pay off, but only if you assess your investments wisely. This may not be a dramatic resolution, but it’s a solid one: a future earned through care, consistency, and self-evaluation.\n\n"
+        "🔮 Final Reflection:\n"
+        "This spread tells the story of someone in emotional transition—between letting go of the past, confronting a broken bond or relationship, and walking a foggy, uncertain path forward. You're being invited to face illusions, finish old cycles, and trust your intuition. While it may feel like support is lacking now, the foundation for lasting growth, healing, and joyful connection is already within reach—you just have to be willing to do the patient work, and close what needs closing.\n\n"
+        "The cards encourage you to face these challenges directly...\n"
+        "Remember: Growth often comes through discomfort.\n"
+    )
+    return prompt
+
+
+def build_revision_prompt(reading_data):
+    """Prompt for re-reading only the redrawn positions (reading_data["revise"]) and the final reflection.
+
+    The other positions keep the sections they already have, so neither their
+    meanings nor the long formatting example are sent again.
+    """
+    revise = reading_data["revise"]
+    prompt = (
+        f"Act as a mystical tarot card reader. In this {reading_data['spread_type']} spread, "
+        f"the card in {' and '.join(revise)} has just been redrawn. "
+        "The other positions have already been interpreted.\n\n"
+        "The spread now reads:\n"
+    )
+    for card in reading_data['cards']:
+        prompt += f"{card['position']}: {card['card_name']} ({'Reversed' if card['reversed'] else 'Upright'})\n"
+    
+    prompt += "\nInterpret only the redrawn cards, each in its position and in connection with the other cards:\n\n"
+    for card in reading_data['cards']:
+        if card['position'] in revise:
+            prompt += f"{card['position']}: {card['card_name']}\nMeaning: {card['meaning']}\n\n"
+    
+    prompt += (
+        "Then give a new final reflection on the whole spread. Use exactly this format:\n\n"
+        "[EMOJI] [Position Name]: [Card Name] (Upright/Reversed)\n"
+        "[Interpretation paragraph]\n\n"
+        "🔮 Final Reflection:\n"
+        "[Paragraph 1]\n"
+        "[Paragraph 2]\n"
+        "[Closing statement]\n"
+    )
+    return prompt
+
+
+# --- Parsing AI responses ---------------------------------------------------
+
+ZWJ = "\u200d"
+EMOJI_MODIFIERS = set("\ufe0e\ufe0f\u20e3") | {chr(c) for c in range(0x1f3fb, 0x1f400)}
+
+
+def split_graphemes(text):
+    """Split text into user-perceived characters, keeping emoji ZWJ sequences,
+    variation selectors, skin tones, keycaps, tags and flag pairs together"""
+    clusters = []
+    i = 0
+    while i < len(text):
+        j = i + 1
+        if 0x1f1e6 <= ord(text[i]) <= 0x1f1ff and j < len(text) and 0x1f1e6 <= ord(text[j]) <= 0x1f1ff:
+            j += 1  # Regional indicator pair (flag)
+        while j < len(text):
+            char = text[j]
+            if char in EMOJI_MODIFIERS or 0xe0020 <= ord(char) <= 0xe007f or unicodedata.combining(char):
+                j += 1
+            elif char == ZWJ and j + 1 < len(text):
+                j += 2
+            else:
+                break
+        clusters.append(text[i:j])
+        i = j
+    return clusters
+
+
+def is_emoji(cluster):
+    first = ord(cluster[0])
+    return (
+        "\ufe0f" in cluster
+        or ZWJ in cluster
+        or first >= 0x1f000
+        or (0x2190 <= first <= 0x2bff and unicodedata.category(cluster[0]) == "So")
+    )
+
+
+class InterpretationSection:
+    """One part of an AI reading: a spread position, or the final reflection when position is None"""
+
+    def __init__(self, heading, emoji="", position=None):
+        self.heading = heading
+        self.emoji = emoji
+        self.position = position
+        self.paragraphs = []
+
+    @property
+    def text(self):
+        return "\n".join(self.paragraphs)
+
+    def to_dict(self):
+        return {"position": self.position, "emoji": self.emoji,
+                "heading": self.heading, "text": self.text}
+
+
+class Interpretation:
+    """An AI response parsed into per-position sections plus the final reflection"""
+
+    def __init__(self, raw, sections, reflection, positions):
+        self.raw = raw
+        self.sections = sections
+        self.reflection = reflection
+        self.positions = positions
+        found = {section.position for section in sections}
+        self.missing_positions = [name for name in positions if name not in found]
+        self.unmatched_sections = [section for section in sections if section.position is None]
+
+    @property
+    def is_complete(self):
+        return not self.missing_positions and self.reflection is not None
+
+    def section_for(self, position):
+        for section in self.sections:
+            if section.position == position:
+                return section
+        return None
+
+    def to_dict(self):
+        return {
+            "sections": [section.to_dict() for section in self.sections],
+            "reflection": self.reflection.to_dict() if self.reflection else None,
+            "missing_positions": self.missing_positions,
+        }
+
+    def to_text(self):
+        """The interpretation as text that parse_ai_response reads back the same way"""
+        parts = []
+        for section in self.sections:
+            heading = f"{section.emoji} {section.heading}".strip()
+            parts.append("\n".join(([heading] if heading else []) + section.paragraphs))
+        if self.reflection:
+            parts.append("\n".join([f"{self.reflection.emoji} {self.reflection.heading}:".strip()]
+                                   + self.reflection.paragraphs))
+        return "\n\n".join(parts) + "\n"
+
+
+def match_position(heading, positions, taken):
+    """Find which spread position a section heading refers to, or None"""
+    lowered = heading.lower()
+    # Prefer the longest position name found in the heading ("1 - Present" over "Present")
+    candidates = [name for name in positions if name not in taken and name.lower() in lowered]
+    if candidates:
+        return max(candidates, key=len)
+
+    # Fall back to the position number ("3 - Past (Foundation): ..." or "3. Past: ...")
+    number = re.match(r"\s*(\d+)\s*[-.):]", heading)
+    if number:
+        for name in positions:
+            if name not in taken and name.split(" ", 1)[0] == number.group(1):
+                return name
+    return None
+
+
+def parse_ai_response(text, positions):
+    """Parse an AI reading into an Interpretation, matching sections against the spread's position names"""
+    sections = []
+    reflection = None
+    current = None
+    taken = set()
+
+    for line in text.splitlines():
+        stripped = line.strip().lstrip("-*#• ").strip()
+        if not stripped:
+            continue
+
+        clusters = split_graphemes(stripped)
+        emoji = clusters[0] if is_emoji(clusters[0]) else ""
+        heading = "".join(clusters[1:]).strip() if emoji else stripped
+        heading = heading.replace("**", "").strip()
+
+        if heading.lower().startswith("final reflection"):
+            current = reflection = InterpretationSection(heading.rstrip(":"), emoji)
+            remainder = heading.split(":", 1)[1].strip() if ":" in heading else ""
+            if remainder:
+                current.paragraphs.append(remainder)
+            continue
+
+        position = None
+        if emoji or re.match(r"\d+\s*[-.):]", heading):
+            position = match_position(heading.split(":", 1)[0], positions, taken)
+        if emoji or position:
+            current = InterpretationSection(heading, emoji, position)
+            sections.append(current)
+            if position:
+                taken.add(position)
+            continue
+
+        if current is None:
+            # Preamble before the first heading
+            current = InterpretationSection("", "")
+            sections.append(current)
+        current.paragraphs.append(stripped.replace("**", ""))
+
+    sections = [section for section in sections if section.heading or section.paragraphs]
+    return Interpretation(text, sections, reflection, list(positions))
+
+
+def merge_revision(interpretation, text, revised):
+    """Fold the answer to a revision prompt into an interpretation.
+
+    The sections for the revised positions and the final reflection come from
+    text; every other section is kept. A revised position the answer left out
+    is reported in missing_positions rather than keeping the old card's section.
+    """
+    answer = parse_ai_response(text, revised)
+    sections = [section for section in interpretation.sections if section.position not in revised]
+    sections += [answer.section_for(position) for position in revised if answer.section_for(position)]
+    # Back into spread order, with any preamble first
+    order = {position: i for i, position in enumerate(interpretation.positions)}
+    sections.sort(key=lambda section: order.get(section.position, -1))
+
+    reflection = answer.reflection or interpretation.reflection
+    merged = Interpretation("", sections, reflection, interpretation.positions)
+    merged.raw = merged.to_text()
+    return merged
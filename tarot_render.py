@@ -0,0 +1,167 @@
+"""Headless rendering of readings to PNG, for publishing and batch exports.
+
+Uses the same card faces, spread layouts and labels as the game window, but
+draws to an offscreen surface so no display is needed:
+
+    python tarot_render.py readings/tarot_reading.json -o exports
+    python tarot_render.py readings.jsonl -o exports --workers 8 --size 1920x1080
+
+Input files hold one reading (as written by "Save Reading"), a JSON list of
+readings, or JSON lines with one reading per line. Each worker process keeps
+its decoded card faces between jobs, so only the first job to use a card pays
+for building its face.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from tarot_core import get_spread_type
+
+
+DEFAULT_SIZE = (3840, 2160)
+
+# Set up per process by load_tarot(); the game module opens a display on import
+tarot = None
+backgrounds = {}
+
+
+
+def load_tarot():
+    """Import the game module against SDL's dummy drivers so rendering works without a screen"""
+    global tarot
+    if tarot is None:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        # Otherwise SDL catches SIGTERM, and pool workers ignore the pool shutting them down
+        os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+        import tarot as tarot_module
+        tarot = tarot_module
+    return tarot
+
+
+def get_background(size):
+    """Return the starfield for an output size, seeded so every export of that size matches"""
+    background = backgrounds.get(size)
+    if background is None:
+        state = random.getstate()
+        random.seed(f"background-{size[0]}x{size[1]}")
+        background = tarot.create_background(*size)
+        random.setstate(state)
+        backgrounds[size] = background
+    return background
+
+
+
+def render_reading(reading, size=DEFAULT_SIZE):
+    """Compose a reading dict (from get_reading_data or a saved file) onto a new surface"""
+    load_tarot()
+    width, height = size
+    spread_type = get_spread_type(reading["spread_type"])
+
+    tarot.effects = True  # Exports are always drawn at full quality
+    canvas = tarot.pygame.Surface(size)
+    canvas.blit(get_background(size), (0, 0))
+    tarot.draw_title(canvas, width, 0)
+
+    positions = tarot.spread_layout(spread_type, width, height)
+    for card, pos in zip(reading["cards"], positions):
+        face = tarot.get_card_face(card["card_name"])
+        tarot.draw_card_slot(canvas, face, pos, card["position"], card["reversed"])
+
+    return canvas
+
+
+def render_to_png(reading, path, size=DEFAULT_SIZE):
+    canvas = render_reading(reading, size)
+    tarot.pygame.image.save(canvas, path)
+    return path
+
+
+def render_job(job):
+    """Pool entry point: job is (reading, path, size); returns (path, error message or None)"""
+    reading, path, size = job
+    try:
+        render_to_png(reading, path, size)
+        return path, None
+    except Exception as e:
+        return path, f"{type(e).__name__}: {e}"
+
+
+
+def render_batch(jobs, workers=None, chunksize=8):
+    """Render (reading, path, size) jobs across a process pool, yielding (path, error) as each finishes"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for job in jobs:
+            yield render_job(job)
+        return
+
+    # Spawn rather than fork: SDL state must not be shared with the parent
+    context = multiprocessing.get_context("spawn")
+    pool = context.Pool(workers, initializer=load_tarot)
+    try:
+        yield from pool.imap_unordered(render_job, jobs, chunksize=chunksize)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def load_readings(path):
+    """Read readings from a single-reading JSON file, a JSON list or a JSON lines file"""
+    with open(path, 'r') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+
+
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render saved tarot readings to PNG images.")
+    parser.add_argument("inputs", nargs="+", help="Reading files (.json or .jsonl)")
+    parser.add_argument("-o", "--output", default="exports", help="Directory to write PNGs into")
+    parser.add_argument("--size", default=f"{DEFAULT_SIZE[0]}x{DEFAULT_SIZE[1]}",
+                        help="Output size as WIDTHxHEIGHT")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    os.makedirs(args.output, exist_ok=True)
+
+    jobs = []
+    for input_path in args.inputs:
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        readings = load_readings(input_path)
+        for i, reading in enumerate(readings):
+            name = f"{stem}.png" if len(readings) == 1 else f"{stem}_{i:05d}.png"
+            jobs.append((reading, os.path.join(args.output, name), size))
+
+    start = time.perf_counter()
+    failures = 0
+    for path, error in render_batch(jobs, args.workers):
+        if error:
+            failures += 1
+            print(f"Failed to render {path}: {error}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    print(f"Rendered {len(jobs) - failures} of {len(jobs)} readings in {elapsed:.1f}s")
+    sys.exit(1 if failures else 0)
+
+
+
+
+if __name__ == "__main__":
+    main()
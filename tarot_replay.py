@@ -0,0 +1,293 @@
+"""Record play sessions and replay them headlessly to measure frame times.
+
+Record a session by setting TAROT_RECORD_SESSION when starting the game:
+
+    TAROT_RECORD_SESSION=sessions/stutter.jsonl python tarot.py
+
+The recording holds the deck seed, the clicks, key presses, wheel turns and
+mouse movement of every frame, each AI answer on the frame it arrived, and
+the frame each card started dealing in (which live depends on how fast its
+face was built). Replaying runs the same frames through TarotGame without a
+display or any network calls: the seed deals the same cards, they fly in on
+the recorded frames and the recorded answers come back on the same frames,
+so every frame does the work it did live.
+
+    python tarot_replay.py sessions/stutter.jsonl
+    python tarot_replay.py sessions/*.jsonl --repeat 3 --max-p95 33
+
+With --max-p95 or --max-frame (milliseconds) the exit status is 1 when a
+replay is slower, so recordings double as performance regression tests.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import pygame
+
+from tarot_ai import get_interpreter, reading_key
+from tarot_render import load_tarot
+from tarot_telemetry import Telemetry
+
+
+RECORDING_VERSION = 2  # 2: decks dealt by DeckEngine
+
+
+
+class SessionRecorder:
+    """Writes a session as JSON lines: a header, then one line per input or AI event"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "w")
+        self.frame = -1
+        self.mouse = None
+        self.started = time.perf_counter()
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+
+    def start(self, game, size, quality="native", effects=True):
+        self.write({
+            "version": RECORDING_VERSION,
+            "seed": game.seed,
+            "size": list(size),
+            "quality": quality,
+            "interpreter": game.interpreter.name,
+            "prefetch_ai": game.prefetch_ai,
+            "effects": effects,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def event(self, kind, **data):
+        entry = {"frame": self.frame, "t": round(time.perf_counter() - self.started, 4), "type": kind}
+        entry.update(data)
+        self.write(entry)
+
+    def next_frame(self, mouse_pos, mouse_pressed):
+        """Start a new frame; the mouse is only written when it has moved or changed state"""
+        self.frame += 1
+        mouse = [mouse_pos[0], mouse_pos[1], bool(mouse_pressed)]
+        if mouse != self.mouse:
+            self.mouse = mouse
+            self.event("mouse", pos=mouse[:2], pressed=mouse[2])
+
+    def record_event(self, event):
+        if event.type == pygame.QUIT:
+            self.event("quit")
+        elif event.type == pygame.KEYDOWN:
+            self.event("key", key=event.key)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            self.event("click", button=event.button, pos=list(event.pos))
+        elif event.type == pygame.MOUSEWHEEL:
+            self.event("wheel", y=event.y)
+
+    def record_ai(self, reading_data, future):
+        """Record a finished interpretation request as the game picks it up"""
+        if reading_data is None:
+            return
+        error = future.exception()
+        self.event("ai", key=reading_key(reading_data), backend=future.backend,
+                   errors=[str(e) for e in future.errors],
+                   response=future.result() if error is None else None,
+                   error=None if error is None else f"{type(error).__name__}: {error}")
+
+    def close(self):
+        self.event("end")
+        self.file.close()
+
+
+
+class ReplayedError(Exception):
+    """An AI failure from the recording, raised again on replay"""
+
+
+
+class ReplayScheduler:
+    """Stands in for AIScheduler during a replay.
+
+    Nothing is sent anywhere: each request is answered from the recording on
+    the frame where the original answer reached the game.
+    """
+
+    def __init__(self, arrivals):
+        self.arrivals = list(arrivals)  # "ai" entries in frame order
+        self.pending = {}  # (backend name, reading key) -> Future
+        self.telemetry = Telemetry()  # Kept apart, so replays don't show up in the real metrics
+
+    def submit(self, key, fn, *args, backend=None):
+        future = self.pending.get(key)
+        if future is None:
+            future = self.pending[key] = Future()
+        return future
+
+    def release(self, key):
+        future = self.pending.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def deliver(self, frame):
+        """Resolve the requests whose recorded answers arrived by this frame"""
+        for entry in list(self.arrivals):
+            if entry["frame"] > frame:
+                break
+            key = next((key for key in self.pending if key[1] == entry["key"]), None)
+            if key is None:
+                continue  # Not asked for yet in this replay
+            self.arrivals.remove(entry)
+            future = self.pending.pop(key)
+            if entry["error"] is None and entry["backend"] == key[0]:
+                future.set_result(entry["response"])
+            else:
+                # Failed outright, or this backend failed and a fallback answered
+                errors = entry["errors"] or [entry["error"]]
+                future.set_exception(ReplayedError(errors[-1]))
+
+    def shutdown(self):
+        pass
+
+
+
+def load_recording(path):
+    with open(path, 'r') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries or entries[0].get("version") != RECORDING_VERSION:
+        raise ValueError(f"{path} is not a session recording from this version of the game")
+    return entries[0], entries[1:]
+
+
+def make_event(entry):
+    """Rebuild the pygame event for a recorded input entry"""
+    kind = entry["type"]
+    if kind == "quit":
+        return pygame.event.Event(pygame.QUIT)
+    if kind == "key":
+        return pygame.event.Event(pygame.KEYDOWN, key=entry["key"])
+    if kind == "click":
+        return pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=entry["button"], pos=tuple(entry["pos"]))
+    if kind == "wheel":
+        return pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=entry["y"])
+    return None
+
+
+
+def replay(path):
+    """Replay a recording headlessly and return the time of each frame in milliseconds"""
+    header, entries = load_recording(path)
+    quality = header.get("quality", "native")
+    os.environ.setdefault("TAROT_WINDOW_SIZE", "{}x{}".format(*header["size"]))
+    os.environ.setdefault("TAROT_QUALITY", quality)
+    os.environ["TAROT_TABLES"] = "1"  # Recordings are of a single table
+    tarot = load_tarot()
+    if [tarot.DISPLAY_WIDTH, tarot.DISPLAY_HEIGHT] != header["size"] or tarot.quality != quality:
+        raise ValueError(f"{path} was recorded at {header['size'][0]}x{header['size'][1]} ({quality} quality), "
+                         f"but this replay runs at {tarot.DISPLAY_WIDTH}x{tarot.DISPLAY_HEIGHT} "
+                         f"({tarot.quality} quality)")
+    tarot.effects = header.get("effects", tarot.RENDER_PRESETS[quality][1])
+
+    game = tarot.TarotGame(seed=header["seed"])
+    game.interpreter = get_interpreter(header["interpreter"])
+    game.prefetch_ai = header["prefetch_ai"]
+    game.ai_scheduler = scheduler = ReplayScheduler(e for e in entries if e["type"] == "ai")
+    game.recorded_deals = {(e["deck_seed"], e["name"]): e["deal_frame"] for e in entries if e["type"] == "deal"}
+    tarot.reading_index = None  # Opened afresh in this replay's scratch directory
+    game.reset_deck()
+
+    inputs = {}
+    for entry in entries:
+        if entry["type"] not in ("ai", "deal", "end"):
+            inputs.setdefault(entry["frame"], []).append(entry)
+    last_frame = max((entry["frame"] for entry in entries), default=0)
+
+    times = []
+    cwd = os.getcwd()
+    # Saved readings go to a scratch directory rather than over the real ones
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            for frame in range(last_frame + 1):
+                start = time.perf_counter()
+                for entry in inputs.get(frame, ()):
+                    if entry["type"] == "mouse":
+                        game.mouse_pos = tuple(entry["pos"])
+                        game.mouse_pressed = entry["pressed"]
+                    else:
+                        event = make_event(entry)
+                        if event is not None:
+                            tarot.handle_event(game, event)
+                scheduler.deliver(frame)
+                game.draw(tarot.screen)
+                tarot.surface_stats.end_frame()
+                tarot.present()
+                times.append((time.perf_counter() - start) * 1000)
+        finally:
+            os.chdir(cwd)
+    return times
+
+
+
+def summarize(times):
+    ordered = sorted(times)
+    percentile = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+    slowest = sorted(range(len(times)), key=lambda i: -times[i])[:5]
+    return {
+        "frames": len(times),
+        "mean_ms": sum(times) / len(times),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1],
+        "slowest_frames": [[i, times[i]] for i in slowest],
+    }
+
+
+
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded tarot sessions headlessly and time each frame.")
+    parser.add_argument("recordings", nargs="+", help="Session recordings (.jsonl)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Replay each recording this many times (later runs start with warm caches)")
+    parser.add_argument("--max-p95", type=float, default=None, help="Fail if the 95th percentile frame is slower (ms)")
+    parser.add_argument("--max-frame", type=float, default=None, help="Fail if any frame is slower (ms)")
+    parser.add_argument("--json", default=None, help="Also write the timings summary to this file")
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for path in args.recordings:
+        for run in range(args.repeat):
+            summary = summarize(replay(path))
+            summary.update(recording=path, run=run + 1)
+            results.append(summary)
+
+            slowest = ", ".join(f"#{frame} {ms:.1f}" for frame, ms in summary["slowest_frames"])
+            print(f"{path} run {run + 1}: {summary['frames']} frames, mean {summary['mean_ms']:.1f} ms, "
+                  f"p50 {summary['p50_ms']:.1f}, p95 {summary['p95_ms']:.1f}, p99 {summary['p99_ms']:.1f}, "
+                  f"max {summary['max_ms']:.1f} (slowest: {slowest})")
+
+            if args.max_p95 is not None and summary["p95_ms"] > args.max_p95:
+                print(f"  p95 frame time is over {args.max_p95} ms", file=sys.stderr)
+                failed = True
+            if args.max_frame is not None and summary["max_ms"] > args.max_frame:
+                print(f"  a frame took over {args.max_frame} ms", file=sys.stderr)
+                failed = True
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+    sys.exit(1 if failed else 0)
+
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""Similarity search over saved readings ("find readings like this one").
+
+Every saved reading is appended to readings/history.jsonl and added to a
+ReadingIndex, as a sparse vector of:
+
+- slot features: card, position and orientation together
+- card features: card and orientation, wherever the card fell
+- keywords from the reading's AI interpretation, when it had one
+
+Readings are compared by TF-IDF cosine. Postings store raw weights and IDF is
+applied at query time, so nothing has to be re-weighted as readings are added. Each card of a query
+also reaches the cards whose card_meanings.json text is most alike (TF-IDF
+cosine), so a reading with Death can match one with the Ten of Swords.
+
+Postings are kept sorted by term in NumPy arrays (compressed sparse columns).
+New readings go to a small unsorted tail that is merged in as it grows, and a
+query is scored by scatter-adding the postings of its terms into one array. The index
+is saved next to the history and brought up to date from it on open.
+
+    python tarot_search.py readings/tarot_reading.json -k 5
+"""
+import argparse
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from tarot_core import card_meanings
+
+
+HISTORY_PATH = os.path.join("readings", "history.jsonl")
+
+SLOT_WEIGHT = 1.0  # Same card, same position, same way up
+CARD_WEIGHT = 0.7  # Same card the same way up, anywhere in the spread
+TEXT_WEIGHT = 0.5  # Shared interpretation keywords
+MAX_KEYWORDS = 32  # Keywords kept per interpretation, by TF-IDF
+RELATED_CARDS = 4  # Meaning-alike card orientations each query card also matches
+MIN_MERGE = 65536  # Tail postings before they are merged into the sorted arrays
+
+WORD_RE = re.compile(r"[a-z][a-z']+")
+STOPWORDS = frozenset("""
+    about above after again against all also and any are because been before being below between both
+    but can could did does doing down during each even few for from further had has have having her here
+    hers him his how into its itself just may might more most much must not now off once only other our
+    ours out over own same she should some such than that the their theirs them then there these they
+    this those through too under until upon very was were what when where which while who whom why will
+    with within without would you your yours yourself card cards reading position
+""".split())
+
+
+
+def words(text):
+    return [word for word in WORD_RE.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+
+def card_term(name, reversed):
+    return f"card:{name}|{'reversed' if reversed else 'upright'}"
+
+
+def interpretation_text(reading):
+    interpretation = reading.get("interpretation") or {}
+    parts = [section.get("text", "") for section in interpretation.get("sections") or []]
+    if interpretation.get("reflection"):
+        parts.append(interpretation["reflection"].get("text", ""))
+    return "\n".join(parts)
+
+
+def grow(array, size):
+    """Return array with room for at least size entries, doubling to keep appends cheap"""
+    if len(array) >= size:
+        return array
+    bigger = np.zeros(max(size, 2 * len(array)), array.dtype)
+    bigger[:len(array)] = array
+    return bigger
+
+
+
+def build_meaning_neighbours(meanings, count=RELATED_CARDS):
+    """Map each card orientation's term to the orientations with the most similar meaning text"""
+    keys = [(name, reversed) for name in meanings for reversed in (False, True)]
+    docs = [Counter(words(meanings[name].get("reversed" if reversed else "upright", ""))) for name, reversed in keys]
+    vocab = {}
+    for doc in docs:
+        for word in doc:
+            vocab.setdefault(word, len(vocab))
+
+    matrix = np.zeros((len(keys), len(vocab)), np.float32)
+    for i, doc in enumerate(docs):
+        for word, n in doc.items():
+            matrix[i, vocab[word]] = 1 + math.log(n)
+    df = np.count_nonzero(matrix, axis=0)
+    matrix *= np.log((1 + len(keys)) / (1 + df)) + 1
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    neighbours = {}
+    for i, (name, reversed) in enumerate(keys):
+        top = np.argsort(-similarity[i])[:count]
+        neighbours[card_term(name, reversed)] = [
+            (card_term(*keys[j]), float(similarity[i, j])) for j in top if similarity[i, j] > 0
+        ]
+    return neighbours
+
+
+
+class ReadingIndex:
+    def __init__(self, history_path=HISTORY_PATH):
+        self.history_path = history_path
+        self.snapshot_path = os.path.splitext(history_path)[0] + "_index.npz"
+        self.vocab = {}  # term -> id
+        self.df = np.zeros(1024, np.int64)  # Readings containing each term
+        # Merged postings, sorted by term: term t's are [indptr[t], indptr[t + 1])
+        self.indptr = np.zeros(1, np.int64)
+        self.doc_ids = np.zeros(0, np.int32)
+        self.weights = np.zeros(0, np.float32)
+        # Postings added since the last merge, in arrival order
+        self.tail_terms = []
+        self.tail_docs = []
+        self.tail_weights = []
+        self.tail_size = 0
+        self.norms = np.zeros(1024, np.float32)
+        self.offsets = np.zeros(1024, np.int64)  # Where each reading starts in the history file
+        self.count = 0
+        self.indexed_bytes = 0  # How much of the history file has been indexed
+        self.dirty = False
+        self.neighbours = build_meaning_neighbours(card_meanings)
+
+    @classmethod
+    def open(cls, history_path=HISTORY_PATH):
+        """Load the saved index, then index whatever was added to the history since it was saved"""
+        index = cls(history_path)
+        try:
+            index.load_snapshot()
+        except (OSError, ValueError, KeyError):
+            index = cls(history_path)  # Missing or stale; rebuilt from the history below
+        index.catch_up()
+        return index
+
+
+
+    def term_id(self, term):
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.vocab)
+            self.df = grow(self.df, term_id + 1)
+        return term_id
+
+    def idf(self, term_ids):
+        return np.log((self.count + 1) / (self.df[term_ids] + 1)) + 1
+
+    def features(self, reading):
+        """Term -> weight for a reading's cards and interpretation keywords"""
+        features = Counter()
+        for card in reading["cards"]:
+            orientation = "reversed" if card["reversed"] else "upright"
+            features[f"slot:{card['position']}|{card['card_name']}|{orientation}"] += SLOT_WEIGHT
+            features[card_term(card["card_name"], card["reversed"])] += CARD_WEIGHT
+
+        counts = Counter(words(interpretation_text(reading)))
+        if counts:
+            # Keep the words that say most about this reading: frequent here, rare elsewhere
+            def tf_idf(word):
+                term_id = self.vocab.get(f"word:{word}")
+                df = self.df[term_id] if term_id is not None else 0
+                return (1 + math.log(counts[word])) * math.log((self.count + 1) / (df + 1))
+            for word in sorted(counts, key=tf_idf, reverse=True)[:MAX_KEYWORDS]:
+                features[f"word:{word}"] += TEXT_WEIGHT * (1 + math.log(counts[word]))
+        return features
+
+
+
+    def add(self, reading, offset=0):
+        """Index one reading; returns its document id"""
+        doc = self.count
+        features = self.features(reading)
+        term_ids = np.fromiter((self.term_id(term) for term in features), np.int64, len(features))
+        weights = np.fromiter(features.values(), np.float32, len(features))
+
+        self.df[term_ids] += 1
+        self.tail_terms.append(term_ids)
+        self.tail_docs.append(np.full(len(term_ids), doc, np.int32))
+        self.tail_weights.append(weights)
+        self.tail_size += len(term_ids)
+
+        self.norms = grow(self.norms, doc + 1)
+        self.offsets = grow(self.offsets, doc + 1)
+        self.offsets[doc] = offset
+        self.count += 1
+        self.dirty = True
+
+        # Merging costs time proportional to the whole index, so let the tail grow with it
+        if self.tail_size >= max(MIN_MERGE, min(len(self.doc_ids) // 8, 1 << 20)):
+            self.merge()
+        return doc
+
+    def merge(self):
+        """Fold the tail into the term-sorted postings without re-sorting what is already there"""
+        if not self.tail_size:
+            return
+        terms = np.concatenate(self.tail_terms)
+        docs = np.concatenate(self.tail_docs)
+        weights = np.concatenate(self.tail_weights)
+        vocab_size = len(self.vocab)
+
+        old_counts = np.zeros(vocab_size, np.int64)
+        old_counts[:len(self.indptr) - 1] = np.diff(self.indptr)
+        new_counts = np.bincount(terms, minlength=vocab_size)
+        indptr = np.zeros(vocab_size + 1, np.int64)
+        np.cumsum(old_counts + new_counts, out=indptr[1:])
+
+        merged_docs = np.empty(indptr[-1], np.int32)
+        merged_weights = np.empty(indptr[-1], np.float32)
+
+        # Old postings keep their order, shifted by the new postings of earlier terms
+        shift = np.repeat(indptr[:-1] - np.concatenate(([0], np.cumsum(old_counts)[:-1])), old_counts)
+        old_positions = np.arange(len(self.doc_ids)) + shift
+        merged_docs[old_positions] = self.doc_ids
+        merged_weights[old_positions] = self.weights
+
+        # New postings have higher document ids, so they go after the old ones of each term
+        order = np.argsort(terms, kind="stable")
+        sorted_terms = terms[order]
+        starts = np.concatenate(([0], np.cumsum(new_counts)[:-1]))
+        rank = np.arange(len(terms)) - starts[sorted_terms]
+        new_positions = indptr[sorted_terms] + old_counts[sorted_terms] + rank
+        merged_docs[new_positions] = docs[order]
+        merged_weights[new_positions] = weights[order]
+
+        self.indptr, self.doc_ids, self.weights = indptr, merged_docs, merged_weights
+        self.tail_terms, self.tail_docs, self.tail_weights = [], [], []
+        self.tail_size = 0
+
+        # Reading lengths under the current IDF, which has moved since the last merge
+        idf = self.idf(np.arange(vocab_size))
+        weighted = merged_weights * np.repeat(idf, old_counts + new_counts)
+        self.norms[:self.count] = np.sqrt(np.bincount(merged_docs, weighted * weighted, minlength=self.count))
+
+
+
+    def search(self, reading, k=5, exclude=()):
+        """Return up to k (doc id, cosine score) pairs for the readings most like reading, best first"""
+        if not self.count:
+            return []
+        features = self.features(reading)
+        # Each card also reaches the cards whose meanings read most alike
+        for card in reading["cards"]:
+            for term, similarity in self.neighbours.get(card_term(card["card_name"], card["reversed"]), ()):
+                features[term] += CARD_WEIGHT * similarity
+
+        known = [(self.vocab[term], weight) for term, weight in features.items() if term in self.vocab]
+        if not known:
+            return []
+        term_ids = np.array([term_id for term_id, _ in known], np.int64)
+        idf = self.idf(term_ids)
+        query = np.array([weight for _, weight in known], np.float64) * idf
+        factors = (query * idf).astype(np.float32)  # The document side's IDF is applied here, not stored
+        query_norm = np.sqrt(np.dot(query, query))
+
+        # Scatter-add one term at a time: cheaper than gathering every posting for one bincount
+        scores = np.zeros(self.count, np.float32)
+        merged_terms = len(self.indptr) - 1
+        for term_id, factor in zip(term_ids, factors):
+            if term_id < merged_terms:
+                start, end = self.indptr[term_id], self.indptr[term_id + 1]
+                np.add.at(scores, self.doc_ids[start:end], self.weights[start:end] * factor)
+
+        norms = self.norms[:self.count]
+        if self.tail_size:
+            lookup = np.zeros(len(self.vocab), np.float32)
+            lookup[term_ids] = factors
+            tail_terms = np.concatenate(self.tail_terms)
+            tail_docs = np.concatenate(self.tail_docs)
+            tail_weights = np.concatenate(self.tail_weights)
+            np.add.at(scores, tail_docs, tail_weights * lookup[tail_terms])
+
+            # Readings not merged yet have no length stored, so measure them here
+            weighted = tail_weights * self.idf(tail_terms)
+            norms = norms.copy()
+            first = tail_docs[0]
+            norms[first:] = np.sqrt(np.bincount(tail_docs - first, weighted * weighted))
+
+        scores /= norms * np.float32(query_norm)
+        for doc in exclude:
+            scores[doc] = 0
+
+        k = min(k, self.count)
+        top = np.argpartition(scores, self.count - k)[-k:]
+        top = top[np.argsort(-scores[top])]
+        return [(int(doc), float(scores[doc])) for doc in top if scores[doc] > 0]
+
+    def reading(self, doc):
+        """Load a reading back from the history file"""
+        with open(self.history_path, 'rb') as f:
+            f.seek(int(self.offsets[doc]))
+            return json.loads(f.readline())
+
+
+
+    def append(self, reading):
+        """Add a reading to the history file and the index; returns its document id"""
+        record = dict(reading, saved_at=datetime.now().isoformat(timespec="seconds"))
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        directory = os.path.dirname(self.history_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.catch_up()  # Readings another window or process saved since this index last looked
+        with open(self.history_path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(line)
+        self.indexed_bytes = offset + len(line)
+        return self.add(record, offset)
+
+    def catch_up(self):
+        """Index readings appended to the history file since indexed_bytes"""
+        if not os.path.exists(self.history_path):
+            return
+        with open(self.history_path, 'rb') as f:
+            f.seek(self.indexed_bytes)
+            offset = self.indexed_bytes
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written
+                try:
+                    self.add(json.loads(line), offset)
+                except (ValueError, KeyError, TypeError):
+                    pass  # Not a reading; skip it
+                offset += len(line)
+            self.indexed_bytes = offset
+
+
+
+    def save(self):
+        """Write the index next to the history, so the next open only indexes new readings"""
+        if not self.dirty:
+            return
+        self.merge()
+        temp_path = self.snapshot_path + ".tmp.npz"
+        np.savez(temp_path, indptr=self.indptr, doc_ids=self.doc_ids, weights=self.weights,
+                 df=self.df[:len(self.vocab)], norms=self.norms[:self.count],
+                 offsets=self.offsets[:self.count],
+                 meta=np.array(json.dumps({"terms": list(self.vocab), "count": self.count,
+                                           "indexed_bytes": self.indexed_bytes})))
+        os.replace(temp_path, self.snapshot_path)
+        self.dirty = False
+
+    def load_snapshot(self):
+        with np.load(self.snapshot_path) as data:
+            meta = json.loads(str(data["meta"]))
+            if os.path.getsize(self.history_path) < meta["indexed_bytes"]:
+                raise ValueError("History is shorter than the saved index")
+            self.vocab = {term: i for i, term in enumerate(meta["terms"])}
+            self.count = meta["count"]
+            self.indexed_bytes = meta["indexed_bytes"]
+            self.indptr = data["indptr"]
+            self.doc_ids = data["doc_ids"]
+            self.weights = data["weights"]
+            self.df = data["df"].copy()
+            self.norms = data["norms"].copy()
+            self.offsets = data["offsets"].copy()
+
+
+
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find saved readings most like a given one.")
+    parser.add_argument("reading", help="Reading file to match (as written by Save Reading)")
+    parser.add_argument("-k", type=int, default=5, help="Number of matches to show")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    args = parser.parse_args()
+
+    with open(args.reading, 'r') as f:
+        query = json.load(f)
+
+    start = time.perf_counter()
+    index = ReadingIndex.open(args.history)
+    index.save()
+    opened = time.perf_counter()
+    results = index.search(query, args.k)
+    searched = time.perf_counter()
+
+    print(f"{index.count} readings indexed in {opened - start:.2f}s, searched in {(searched - opened) * 1000:.1f} ms")
+    for doc, score in results:
+        reading = index.reading(doc)
+        cards = ", ".join(f"{card['card_name']}{' (R)' if card['reversed'] else ''}" for card in reading["cards"])
+        print(f"{score:.3f}  {reading.get('saved_at', '')}  {reading['spread_type']}: {cards}")
+
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""Local HTTP/JSON service that deals and interprets readings for web and mobile front-ends.
+
+Runs on plain asyncio without pygame, so one process can hold thousands of
+sessions, each with its own deck:
+
+    python tarot_server.py --port 8765
+
+Endpoints (all bodies and responses are JSON):
+
+    POST   /sessions                        start a session with a freshly shuffled deck
+    GET    /sessions/<id>                   deck size and the current reading
+    POST   /sessions/<id>/shuffle           reset the deck and clear the reading
+    POST   /sessions/<id>/spread            {"spread": "single" | "three" | "celtic"}
+    POST   /sessions/<id>/interpretation    AI interpretation of the current reading
+    DELETE /sessions/<id>                   end the session
+    GET    /metrics                         AI call telemetry in the Prometheus text format
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+from tarot_ai import AIScheduler, get_interpreter, request_interpretation
+from tarot_core import (
+    SPREAD_SINGLE, SPREAD_THREE, SPREAD_CELTIC, SPREAD_NAMES,
+    DeckEngine, build_reading_data, parse_ai_response
+)
+
+
+SPREADS_BY_KEY = {
+    "single": SPREAD_SINGLE,
+    "three": SPREAD_THREE,
+    "celtic": SPREAD_CELTIC,
+}
+
+MAX_BODY_BYTES = 64 * 1024
+READ_TIMEOUT = 30
+
+STATUS_TEXT = {
+    200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request",
+    404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+    413: "Payload Too Large", 502: "Bad Gateway", 503: "Service Unavailable",
+}
+
+
+
+class PlainText(str):
+    """Response body sent as plain text rather than JSON"""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+
+class ReadingSession:
+    """Deck and reading state for one client, mirroring a single TarotGame window"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.deck_engine = DeckEngine()  # Per-session generator, seeded from the OS
+        self.deck = self.deck_engine.new_deck()
+        self.current_spread = None
+        self.current_cards = []  # (card_name, reversed) pairs in position order
+        self.reading_id = 0
+        self.ai_response = None
+        self.ai_interpretation = None
+        self.ai_task = None
+        self.ai_request = None  # InterpretationRequest behind ai_task, cancelled if the reading is dropped
+        self.last_seen = time.monotonic()
+
+    def shuffle_deck(self):
+        """Reset to full 78-card deck, clear current reading, and shuffle"""
+        self.deck = self.deck_engine.new_deck()
+        self.current_spread = None
+        self.current_cards = []
+        self.reading_id += 1
+        self.clear_interpretation()
+
+    def do_spread(self, spread_type):
+        # Same as TarotGame.do_spread: always reset and shuffle before each new reading
+        self.deck = self.deck_engine.new_deck()
+        self.current_spread = spread_type
+        self.current_cards = [self.deck.pop() for _ in SPREAD_NAMES[spread_type]]
+        self.reading_id += 1
+        self.clear_interpretation()
+
+    def clear_interpretation(self):
+        """Drop the AI reading, cancelling a request still working on it so it stops using the quota"""
+        if self.ai_request is not None:
+            self.ai_request.cancel_request()
+        self.ai_request = None
+        self.ai_task = None
+        self.ai_response = None
+        self.ai_interpretation = None
+
+    def get_reading_data(self):
+        if not self.current_cards:
+            return None
+        return build_reading_data(self.current_spread, self.current_cards)
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "cards_left": len(self.deck),
+            "deck_seed": self.deck.seed,
+            "reading": self.get_reading_data(),
+            "ai_response": self.ai_response,
+            "interpretation": self.ai_interpretation.to_dict() if self.ai_interpretation else None,
+        }
+
+
+
+class TarotServer:
+    def __init__(self, interpreter=None, max_ai_calls=8, ai_requests_per_minute=60,
+                 session_ttl=1800, max_sessions=100000):
+        self.sessions = {}
+        self.interpreter = interpreter or get_interpreter()
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.ai_scheduler = AIScheduler(requests_per_minute=ai_requests_per_minute,
+                                        max_concurrent=max_ai_calls)
+
+
+
+    def get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, "Unknown session.")
+        session.last_seen = time.monotonic()
+        return session
+
+
+
+    async def interpret(self, session):
+        """Return the AI reading for the session's current spread, sharing any request already running"""
+        if not session.current_cards:
+            raise HTTPError(409, "No reading to interpret! Draw cards first.")
+        if session.ai_response is not None:
+            return session.ai_response
+
+        reading_id = session.reading_id
+        if session.ai_task is None or session.ai_task.reading_id != reading_id:
+            # The scheduler rate-limits, retries, and shares identical readings across sessions
+            session.ai_request = request_interpretation(self.ai_scheduler, self.interpreter, session.get_reading_data())
+            session.ai_task = asyncio.ensure_future(asyncio.wrap_future(session.ai_request))
+            session.ai_task.reading_id = reading_id
+        task = session.ai_task
+
+        try:
+            response = await asyncio.shield(task)
+        except (Exception, asyncio.CancelledError) as e:
+            if not task.done():
+                raise  # This client's request was cancelled, not the interpretation
+            if self.sessions.get(session.session_id) is not session:
+                raise HTTPError(410, "The session ended before its interpretation was ready.")
+            if session.reading_id != reading_id:
+                raise HTTPError(409, "The reading was dealt again before its interpretation was ready.")
+            if session.ai_task is task:
+                session.ai_task = None
+            raise HTTPError(502, f"Failed to get AI reading: {str(e)}")
+
+        # Only keep the response if the reading wasn't re-dealt while we waited
+        if session.reading_id == reading_id:
+            session.ai_response = response
+            session.ai_interpretation = parse_ai_response(response, SPREAD_NAMES[session.current_spread])
+        return response
+
+
+
+    async def route(self, method, path, body):
+        parts = [part for part in path.split("?", 1)[0].split("/") if part]
+
+        if parts == ["metrics"]:
+            if method != "GET":
+                raise HTTPError(405, "Use GET to read metrics.")
+            return 200, PlainText(self.ai_scheduler.telemetry.prometheus())
+
+        if parts == ["sessions"]:
+            if method != "POST":
+                raise HTTPError(405, "Use POST to start a session.")
+            if len(self.sessions) >= self.max_sessions:
+                raise HTTPError(503, "Too many active sessions.")
+            session = ReadingSession(uuid.uuid4().hex)
+            self.sessions[session.session_id] = session
+            return 201, session.to_dict()
+
+        if len(parts) < 2 or parts[0] != "sessions":
+            raise HTTPError(404, "Not found.")
+
+        session = self.get_session(parts[1])
+        action = parts[2] if len(parts) > 2 else None
+
+        if action is None and method == "GET":
+            return 200, session.to_dict()
+        if action is None and method == "DELETE":
+            session.clear_interpretation()
+            del self.sessions[session.session_id]
+            return 204, None
+        if action == "shuffle" and method == "POST":
+            session.shuffle_deck()
+            return 200, session.to_dict()
+        if action == "spread" and method == "POST":
+            spread_type = SPREADS_BY_KEY.get(str(body.get("spread", "")).lower())
+            if spread_type is None:
+                raise HTTPError(400, f"Unknown spread. Choose one of: {', '.join(SPREADS_BY_KEY)}")
+            session.do_spread(spread_type)
+            return 200, session.to_dict()
+        if action == "interpretation" and method == "POST":
+            await self.interpret(session)
+            return 200, session.to_dict()
+
+        raise HTTPError(405, "Unsupported request.")
+
+
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), READ_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                    return
+
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self.write_response(writer, 400, {"error": "Malformed request line."}, False)
+                    return
+
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY_BYTES:
+                        raise HTTPError(413, "Request body too large.")
+                    raw_body = await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT) if length else b""
+                    try:
+                        body = json.loads(raw_body) if raw_body else {}
+                    except ValueError:
+                        raise HTTPError(400, "Body must be JSON.")
+                    if not isinstance(body, dict):
+                        raise HTTPError(400, "Body must be a JSON object.")
+
+                    if method == "OPTIONS":
+                        status, payload = 204, None
+                    else:
+                        status, payload = await self.route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                    if status == 413:
+                        keep_alive = False  # The unread body is still on the socket
+                except ValueError:
+                    status, payload = 400, {"error": "Invalid Content-Length."}
+                    keep_alive = False
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    return
+
+                await self.write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def write_response(self, writer, status, payload, keep_alive):
+        if isinstance(payload, PlainText):
+            body, content_type = payload.encode("utf-8"), payload.content_type
+        else:
+            body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Access-Control-Allow-Origin: *\r\n"
+            f"Access-Control-Allow-Methods: GET, POST, DELETE, OPTIONS\r\n"
+            f"Access-Control-Allow-Headers: Content-Type\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+
+    async def expire_sessions(self):
+        """Drop sessions that have been idle for longer than session_ttl"""
+        while True:
+            await asyncio.sleep(min(60, self.session_ttl))
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id in [sid for sid, s in self.sessions.items() if s.last_seen < cutoff]:
+                self.sessions.pop(session_id).clear_interpretation()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        expiry = asyncio.ensure_future(self.expire_sessions())
+        print(f"Mystic Tarot server listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            expiry.cancel()
+            self.ai_scheduler.shutdown()
+
+
+
+
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Serve tarot readings over a local HTTP/JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interpreter", default=None,
+                        help='Backend or fallback chain, e.g. "openai,offline", "local" or "offline" '
+                             '(default: TAROT_INTERPRETER or "openai,offline")')
+    parser.add_argument("--max-ai-calls", type=int, default=8,
+                        help="Maximum number of AI interpretation requests in flight at once")
+    parser.add_argument("--ai-rpm", type=float, default=60,
+                        help="AI requests per minute allowed by your API quota")
+    parser.add_argument("--session-ttl", type=int, default=1800,
+                        help="Seconds of inactivity before a session is dropped")
+    parser.add_argument("--max-sessions", type=int, default=100000)
+    args = parser.parse_args()
+
+    async def run():
+        server = TarotServer(interpreter=get_interpreter(args.interpreter),
+                             max_ai_calls=args.max_ai_calls,
+                             ai_requests_per_minute=args.ai_rpm,
+                             session_ttl=args.session_ttl,
+                             max_sessions=args.max_sessions)
+        await server.serve(args.host, args.port)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Telemetry for interpretation calls: latency histograms, token usage and errors.
+
+Every call the AIScheduler makes (and every offline interpretation) produces
+one record:
+
+    backend, model      which backend answered, and the model it reported
+    cache               "hit" when the call shared a request already in flight
+    queue_s             time spent waiting for a worker and the rate limit
+    ttft_s              time from sending the final attempt to its first token
+    latency_s           total time from submitting the call to its answer
+    prompt_tokens, completion_tokens
+    attempts, error     number of API attempts, and the final error's class
+
+Records are aggregated into histograms (cumulative since start, plus a
+rolling window of recent calls for percentiles) and can be exported:
+
+    TAROT_AI_METRICS_FILE=metrics/tarot_ai.prom   Prometheus text, rewritten after each call
+    TAROT_AI_CALL_LOG=metrics/ai_calls.jsonl      one JSON line per call
+
+The reading server also serves the Prometheus text at GET /metrics.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+QUANTILES = (0.5, 0.95, 0.99)
+TIMINGS = (
+    ("queue_s", "tarot_ai_queue_seconds", "Time interpretation calls waited for a worker and the rate limit."),
+    ("ttft_s", "tarot_ai_time_to_first_token_seconds", "Time from sending a request to its first streamed token."),
+    ("latency_s", "tarot_ai_latency_seconds", "Total time from submitting an interpretation call to its answer."),
+)
+
+# The record of the call running on this thread, for backends to add what only they know
+call_context = threading.local()
+
+
+
+def note_call(**fields):
+    """Add fields (model, ttft_s, token counts) to the record of the call running on this thread"""
+    record = getattr(call_context, "record", None)
+    if record is not None:
+        record.update(fields)
+
+
+def new_record(backend, cache="miss"):
+    return {
+        "backend": backend, "model": None, "cache": cache,
+        "queue_s": None, "ttft_s": None, "latency_s": None,
+        "prompt_tokens": None, "completion_tokens": None,
+        "attempts": 0, "error": None,
+    }
+
+
+def label_text(labels):
+    """Prometheus label set body, with values escaped"""
+    parts = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return ",".join(parts)
+
+
+
+class Histogram:
+    """Cumulative bucket counts, plus the most recent values for rolling percentiles"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window=500):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+
+class Telemetry:
+    def __init__(self, metrics_path=None, call_log_path=None, window=500):
+        self.metrics_path = metrics_path
+        self.call_log_path = call_log_path
+        self.window = window
+        self.histograms = {}  # (field, backend) -> Histogram
+        self.calls = {}  # (backend, model, cache, outcome) -> count
+        self.tokens = {}  # (backend, model, kind) -> total
+        self.errors = {}  # (backend, error class) -> count
+        self.paths_from_env = False  # Read the export paths from the environment on the first record
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Telemetry exporting to TAROT_AI_METRICS_FILE and TAROT_AI_CALL_LOG, when set.
+
+        They are read when the first call is recorded, so a .env loaded after import still counts.
+        """
+        telemetry = cls()
+        telemetry.paths_from_env = True
+        return telemetry
+
+
+
+    def record(self, record):
+        """Aggregate one finished call and write it to the configured exports"""
+        backend = record["backend"]
+        model = record["model"] or "none"
+        with self.lock:
+            if self.paths_from_env:
+                self.paths_from_env = False
+                self.metrics_path = os.getenv("TAROT_AI_METRICS_FILE")
+                self.call_log_path = os.getenv("TAROT_AI_CALL_LOG")
+            for field, _, _ in TIMINGS:
+                if record[field] is not None:
+                    key = (field, backend)
+                    if key not in self.histograms:
+                        self.histograms[key] = Histogram(window=self.window)
+                    self.histograms[key].observe(record[field])
+
+            outcome = "ok" if record["error"] is None else "error"
+            key = (backend, model, record["cache"], outcome)
+            self.calls[key] = self.calls.get(key, 0) + 1
+            for kind in ("prompt", "completion"):
+                if record[f"{kind}_tokens"]:
+                    key = (backend, model, kind)
+                    self.tokens[key] = self.tokens.get(key, 0) + record[f"{kind}_tokens"]
+            if record["error"] is not None:
+                key = (backend, record["error"])
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+            if self.call_log_path:
+                self.append_call_log(record)
+            if self.metrics_path:
+                self.write_metrics_file()
+
+    def append_call_log(self, record):
+        directory = os.path.dirname(self.call_log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.call_log_path, "a") as f:
+            f.write(json.dumps({"time": round(time.time(), 3), **record}) + "\n")
+
+    def write_metrics_file(self):
+        # Written to a temporary file and renamed, so scrapers never read half a file
+        directory = os.path.dirname(self.metrics_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.metrics_path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, self.metrics_path)
+
+
+
+    def summary(self):
+        """Rolling percentiles and totals per backend, as a dict"""
+        with self.lock:
+            backends = {}
+            for (field, backend), histogram in self.histograms.items():
+                stats = backends.setdefault(backend, {})
+                stats[field] = {f"p{int(q * 100)}": histogram.quantile(q) for q in QUANTILES}
+            for (backend, model, cache, outcome), count in self.calls.items():
+                stats = backends.setdefault(backend, {})
+                stats[f"{outcome}_calls"] = stats.get(f"{outcome}_calls", 0) + count
+                stats[f"cache_{cache}"] = stats.get(f"cache_{cache}", 0) + count
+            for (backend, model, kind), total in self.tokens.items():
+                stats = backends.setdefault(backend, {})
+                stats[f"{kind}_tokens"] = stats.get(f"{kind}_tokens", 0) + total
+            return backends
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            return self.render_prometheus()
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP tarot_ai_calls_total Interpretation calls by backend, model, cache result and outcome.",
+            "# TYPE tarot_ai_calls_total counter",
+        ]
+        for (backend, model, cache, outcome), count in sorted(self.calls.items()):
+            labels = label_text([("backend", backend), ("model", model), ("cache", cache), ("outcome", outcome)])
+            lines.append(f"tarot_ai_calls_total{{{labels}}} {count}")
+
+        lines += ["# HELP tarot_ai_tokens_total Tokens used by interpretation calls.",
+                  "# TYPE tarot_ai_tokens_total counter"]
+        for (backend, model, kind), total in sorted(self.tokens.items()):
+            labels = label_text([("backend", backend), ("model", model), ("kind", kind)])
+            lines.append(f"tarot_ai_tokens_total{{{labels}}} {total}")
+
+        lines += ["# HELP tarot_ai_errors_total Failed interpretation calls by error class.",
+                  "# TYPE tarot_ai_errors_total counter"]
+        for (backend, error), count in sorted(self.errors.items()):
+            lines.append(f"tarot_ai_errors_total{{{label_text([('backend', backend), ('error', error)])}}} {count}")
+
+        for field, name, help_text in TIMINGS:
+            histograms = sorted((backend, h) for (f, backend), h in self.histograms.items() if f == field)
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for backend, histogram in histograms:
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{name}_bucket{{{label_text([('backend', backend), ('le', bound)])}}} {count}")
+                lines.append(f"{name}_bucket{{{label_text([('backend', backend), ('le', '+Inf')])}}} {histogram.count}")
+                lines.append(f"{name}_sum{{{label_text([('backend', backend)])}}} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{{{label_text([('backend', backend)])}}} {histogram.count}")
+
+            # Percentiles over the recent window, which the cumulative buckets can't show
+            lines += [f"# HELP {name}_recent {help_text} Percentiles over the last {self.window} calls.",
+                      f"# TYPE {name}_recent gauge"]
+            for backend, histogram in histograms:
+                for q in QUANTILES:
+                    labels = label_text([("backend", backend), ("quantile", q)])
+                    lines.append(f"{name}_recent{{{labels}}} {histogram.quantile(q):.6f}")
+
+        return "\n".join(lines) + "\n"
+
+
+
+# Shared by every scheduler in the process unless one is given its own
+telemetry = Telemetry.from_env()